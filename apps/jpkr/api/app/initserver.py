@@ -1,12 +1,20 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from db import Base, engine
+from db import Base, engine, async_engine, ensure_schema
 from dotenv import load_dotenv
 
 from settings import settings
 from routers.routes_auth import router as auth_router
 from routers.word_images import router as word_images_router
+from utils.tagger_pool import init_tagger_pool
+from utils.executor import init_service_executor, shutdown_service_executor
+from utils.aws_s3 import shutdown_s3_executor
+from utils.session_cache import last_seen_flusher
+from utils.sql_counter import install_sql_counter, sql_count_middleware
+from service.word_index import word_index
+from service.word_cards import build_missing_word_cards
+from service.learning_events import learning_event_buffer, learning_aggregator
 
 
 def server():
@@ -18,7 +26,7 @@ def server():
         yield
         
         # When service is stopped.
-        shutdown()
+        await shutdown()
 
     app = FastAPI(lifespan=lifespan)
 
@@ -36,6 +44,10 @@ def server():
         allow_headers=["*"],
     )
 
+    install_sql_counter(engine, async_engine)
+    if settings.SQL_COUNT_HEADER:
+        app.middleware("http")(sql_count_middleware(settings.SQL_COUNT_WARN))
+
     async def start():
         app.state.progress = 0
         # 확장(있으면 생성, 없으면 무시)
@@ -46,6 +58,14 @@ def server():
             except Exception:
                 pass
         Base.metadata.create_all(bind=engine)        
+        ensure_schema(engine)
+        init_tagger_pool(settings.TAGGER_POOL_SIZE)
+        init_service_executor(settings.SERVICE_THREAD_POOL_SIZE, settings.SERVICE_QUEUE_MAX)
+        word_index.load()
+        build_missing_word_cards()
+        last_seen_flusher.start()
+        learning_event_buffer.start()
+        learning_aggregator.start()
         #async with engine.begin() as conn:
         #    await conn.run_sync(Base.metadata.create_all)
         app.include_router(auth_router)
@@ -53,7 +73,13 @@ def server():
 
         print("service is started.")
 
-    def shutdown():
+    async def shutdown():
+        last_seen_flusher.stop()
+        learning_aggregator.stop()
+        learning_event_buffer.stop()
+        shutdown_service_executor()
+        shutdown_s3_executor()
+        await async_engine.dispose()
         print("service is stopped.")
 
     return app
\ No newline at end of file
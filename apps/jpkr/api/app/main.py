@@ -1,33 +1,37 @@
+import inspect
 from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Query
 from fastapi.responses import JSONResponse
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends, Form
 from initserver import server
-from models import WordData, ExampleData, TextData, UserWordSkillData, UserTextData
-from service.words_crud import create_words_batch, update_words_batch, delete_words_batch, get_all_words, search_words_by_word
-from service.examples_crud import create_examples_batch, update_examples_batch, delete_examples_batch, get_all_examples, search_examples_by_text, get_examples_by_word_id
-from service.analysis_text import analyze_text
-from service.user_word_skill import create_user_word_skill_batch, update_user_word_skill_batch, delete_user_word_skill_batch, get_user_word_skills_by_word_ids, get_all_user_word_skills
+from models import WordData, ExampleData, TextData, UserWordSkillData, UserWordSkillUpsertData, LearningEventData, UserTextData
+from service.words_crud import create_words_batch, update_words_batch, delete_words_batch, get_all_words_async, search_words_by_word_async
+from service.examples_crud import create_examples_batch, update_examples_batch, delete_examples_batch, get_all_examples_async, search_examples_by_text_async, get_examples_by_word_id_async
+from service.analysis_text import analyze_text_async
+from service.user_word_skill import create_user_word_skill_batch, update_user_word_skill_batch, delete_user_word_skill_batch, upsert_user_word_skill_batch, get_due_user_word_skills, get_user_word_skills_by_word_ids, get_all_user_word_skills
 from service.words_personal import create_words_personal, get_random_words_to_learn
+from service.learning_events import ingest_learning_events
 from service.user_text_crud import create_user_text, update_user_text, delete_user_text, get_user_text, get_user_text_list
 from service.user_sevice import UserService
+from service.server_metrics import get_server_metrics
 from db import SessionLocal
 from routers.routes_auth import check_user, get_db
-from utils.auth import get_current_user, CurrentUser
+from utils.auth import get_current_user, get_async_db, CurrentUser
+from utils.executor import run_sync
 
 app = server()
 
 # new auth_service (2025-08-28)
-def auth_service(request: Request, allowed_roles: List[str], db, user, func, *args, **kwargs):    
-    user_id = None
-    if user is None:
-        if '*' not in allowed_roles:
-            return JSONResponse(status_code=401, content={"detail": "Unauthorized"})
-    else:
-        user_id = user.id
+# 동기 서비스 함수는 이벤트 루프를 막지 않도록 스레드 풀(utils.executor)에서 실행한다.
+def _call_service(db, func, user_id, *args, **kwargs):
     try:
         return func(*args, **kwargs, db=db, user_id=user_id)        
+    except HTTPException:
+        # 서비스에서 의도적으로 낸 4xx 등은 그대로 전달
+        db.rollback()
+        raise
     except Exception as e:
         print("Error: ", e)
         db.rollback()
@@ -35,41 +39,71 @@ def auth_service(request: Request, allowed_roles: List[str], db, user, func, *ar
     finally:
         db.close()
 
+async def auth_service(request: Request, allowed_roles: List[str], db, user, func, *args, **kwargs):    
+    user_id = None
+    if user is None:
+        if '*' not in allowed_roles:
+            return JSONResponse(status_code=401, content={"detail": "Unauthorized"})
+    else:
+        user_id = user.id
+    return await run_sync(_call_service, db, func, user_id, *args, **kwargs)
+
 async def auth_service_async(request: Request, allowed_roles: List[str], db, user, func, *args, **kwargs):    
+    user_id = None
     if user is None:
         if '*' not in allowed_roles:
             return JSONResponse(status_code=401, content={"detail": "Unauthorized"})
+    else:
+        user_id = user.id
+    if not inspect.iscoroutinefunction(func):
+        return await run_sync(_call_service, db, func, user_id, *args, **kwargs)
+    is_async_db = isinstance(db, AsyncSession)
     try:
-        return await func(*args, **kwargs, db=db, user_id=user.id)        
+        return await func(*args, **kwargs, db=db, user_id=user_id)        
+    except HTTPException:
+        if is_async_db:
+            await db.rollback()
+        else:
+            db.rollback()
+        raise
     except Exception as e:
         print("Error: ", e)
-        db.rollback()
+        if is_async_db:
+            await db.rollback()
+        else:
+            db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        db.close()
+        if is_async_db:
+            await db.close()
+        else:
+            db.close()
 
 # Words CRUD API endpoints
 @app.post("/words/create/batch")
 async def api_create_words_batch(request: Request, words_data: List[WordData], db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin"], db, user, create_words_batch, words_data)
+    return await auth_service(request, ["admin"], db, user, create_words_batch, words_data)
 
 @app.post("/words/update/batch")
 async def api_update_words(request: Request, words_data: List[WordData], db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):    
-    return auth_service(request, ["admin"], db, user, update_words_batch, words_data)
+    return await auth_service(request, ["admin"], db, user, update_words_batch, words_data)
 
 @app.post("/words/delete/batch")
 async def api_delete_words(request: Request, word_ids: List[str], db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin"], db, user, delete_words_batch, word_ids)
+    return await auth_service(request, ["admin"], db, user, delete_words_batch, word_ids)
 
 @app.post("/words/all")
-async def api_get_words(request: Request, data: Dict[str, Any], db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
+async def api_get_words(request: Request, data: Dict[str, Any], db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
     limit = data.get("limit")
     offset = data.get("offset")
-    return auth_service(request, ["*"], db, user, get_all_words, limit, offset)
+    cursor = data.get("cursor")  # "" 이면 keyset 첫 페이지, 없으면 offset 방식
+    total = data.get("total")    # exact | cached | estimated | none
+    return await auth_service_async(request, ["*"], db, user, get_all_words_async, limit, offset, cursor, total)
 
 @app.get("/words/search/{search_term}")
-async def api_search_word(request: Request, search_term: str, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin", "user"], db, user, search_words_by_word, search_term)
+async def api_search_word(request: Request, search_term: str, limit: Optional[int] = Query(None, ge=1, le=500), cursor: Optional[str] = None,
+                          db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    return await auth_service_async(request, ["admin", "user"], db, user, search_words_by_word_async, search_term, limit, cursor)
 
 # Words Personal API endpoints
 @app.post("/words/create/personal")
@@ -79,87 +113,108 @@ async def api_create_words_personal(request: Request, data_json: str = Form(...)
 
 @app.get("/words/personal/random/{limit}")
 async def api_get_random_words_to_learn(request: Request, limit: int, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin", "user"], db, user, get_random_words_to_learn, limit)
+    return await auth_service(request, ["admin", "user"], db, user, get_random_words_to_learn, limit)
 
 
 # Examples CRUD API endpoints
 @app.post("/examples/create/batch")
 async def api_create_examples(request: Request, examples_data: List[ExampleData], db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin"], db, user, create_examples_batch, examples_data)
+    return await auth_service(request, ["admin"], db, user, create_examples_batch, examples_data)
 
 @app.post("/examples/update/batch")
 async def api_update_examples(request: Request, examples_data: List[ExampleData], db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin"], db, user, update_examples_batch, examples_data)
+    return await auth_service(request, ["admin"], db, user, update_examples_batch, examples_data)
 
 @app.post("/examples/delete/batch")
 async def api_delete_examples(request: Request, example_ids: List[str], db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin"], db, user, delete_examples_batch, example_ids)
+    return await auth_service(request, ["admin"], db, user, delete_examples_batch, example_ids)
 
 @app.post("/examples/all")
-async def api_get_examples(request: Request, data: Dict[str, Any], db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
+async def api_get_examples(request: Request, data: Dict[str, Any], db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
     limit = data.get("limit")
     offset = data.get("offset")
-    return auth_service(request, ["*"], db, user, get_all_examples, limit, offset)
+    cursor = data.get("cursor")  # "" 이면 keyset 첫 페이지, 없으면 offset 방식
+    total = data.get("total")    # exact | cached | estimated | none
+    return await auth_service_async(request, ["*"], db, user, get_all_examples_async, limit, offset, cursor, total)
 
 
 @app.get("/examples/search/{search_term}")
-async def api_search_example(request: Request, search_term: str, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin"], db, user, search_examples_by_text, search_term)
+async def api_search_example(request: Request, search_term: str, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    return await auth_service_async(request, ["admin"], db, user, search_examples_by_text_async, search_term)
 
 @app.get("/examples/word/{word_id}")
-async def api_get_examples_by_word(request: Request, word_id: str, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin"], db, user, get_examples_by_word_id, word_id)
+async def api_get_examples_by_word(request: Request, word_id: str, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    return await auth_service_async(request, ["admin"], db, user, get_examples_by_word_id_async, word_id)
 
 
 
+# User Word Skill API endpoints
+@app.post("/user_word_skill/upsert/batch")
+async def api_upsert_user_word_skills(request: Request, user_word_skill_data: List[UserWordSkillUpsertData], db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
+    return await auth_service(request, ["admin", "user"], db, user, upsert_user_word_skill_batch, user_word_skill_data)
+
+@app.get("/user_word_skill/due/{limit}")
+async def api_get_due_user_word_skills(request: Request, limit: int, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
+    return await auth_service(request, ["admin", "user"], db, user, get_due_user_word_skills, limit)
+
+
+# Learning event API endpoints
+@app.post("/learning_events/batch")
+async def api_ingest_learning_events(request: Request, events: List[LearningEventData], db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
+    return await auth_service(request, ["admin", "user"], db, user, ingest_learning_events, events)
+
+
 # User Text CRUD API endpoints
 @app.post("/user_text/create")
 async def api_create_user_text(request: Request, user_text_data: UserTextData, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin", "user"], db, user, create_user_text, user_text_data)
+    return await auth_service(request, ["admin", "user"], db, user, create_user_text, user_text_data)
 
 @app.get("/user_text/get/{user_text_id}")
 async def api_get_user_text(request: Request, user_text_id: str, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin", "user"], db, user, get_user_text, user_text_id)
+    return await auth_service(request, ["admin", "user"], db, user, get_user_text, user_text_id)
 
 @app.get("/user_text/all")
 async def api_get_user_text_list(request: Request, limit: int = None, offset: int = None, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin", "user"], db, user, get_user_text_list, limit, offset)
+    return await auth_service(request, ["admin", "user"], db, user, get_user_text_list, limit, offset)
 
 @app.post("/user_text/update")
 async def api_update_user_text(request: Request, user_text_data: UserTextData, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin", "user"], db, user, update_user_text, user_text_data)
+    return await auth_service(request, ["admin", "user"], db, user, update_user_text, user_text_data)
 
 @app.get("/user_text/delete/{user_text_id}")
 async def api_delete_user_text(request: Request, user_text_id: str, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin", "user"], db, user, delete_user_text, user_text_id)
+    return await auth_service(request, ["admin", "user"], db, user, delete_user_text, user_text_id)
 
 
 # User CRUD API endpoints
 @app.get("/user_admin/get_all_users/{limit}/{offset}")
 async def api_get_user_list(request: Request, limit: int = None, offset: int = None, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin"], db, user, UserService.get_users, limit, offset)
+    return await auth_service(request, ["admin"], db, user, UserService.get_users, limit, offset)
 
 @app.get("/user_data/summary/admin/{user_id}")
 async def api_get_user_summary_admin(request: Request, user_id: str, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin"], db, user, UserService.get_user_summary, user_id)
+    return await auth_service(request, ["admin"], db, user, UserService.get_user_summary, user_id)
 
 @app.get("/user_data/all/admin/{user_id}")
 async def api_get_user_all_data_admin(request: Request, user_id: str, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin"], db, user, UserService.get_user_with_all_data, user_id)
+    return await auth_service(request, ["admin"], db, user, UserService.get_user_with_all_data, user_id)
 
 @app.get("/user_data/summary/user")
 async def api_get_user_summary_user(request: Request, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin", "user"], db, user, UserService.get_user_summary, "me")
+    return await auth_service(request, ["admin", "user"], db, user, UserService.get_user_summary, "me")
 
 @app.get("/user_data/all/user")
 async def api_get_user_all_data_user(request: Request, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["admin", "user"], db, user, UserService.get_user_with_all_data, "me")
+    return await auth_service(request, ["admin", "user"], db, user, UserService.get_user_with_all_data, "me")
 
 
 # Text Analysis API endpoint
 @app.post("/text/analyze")
-async def api_analyze_text(request: Request, text_data: TextData, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
-    return auth_service(request, ["*"], db, user, analyze_text, text_data.text)
-
+async def api_analyze_text(request: Request, text_data: TextData, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    return await auth_service_async(request, ["*"], db, user, analyze_text_async, text_data.text, text_data.format)
 
 
+# Server Metrics API endpoint
+@app.get("/admin/metrics")
+async def api_get_server_metrics(request: Request, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
+    return await auth_service(request, ["admin"], db, user, get_server_metrics)
@@ -1,5 +1,6 @@
+from datetime import datetime
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class WordData(BaseModel):
     id: Optional[str] = None
@@ -41,6 +42,25 @@ class UserWordSkillData(BaseModel):
     skill_sentence_listening: Optional[int] = None
     is_favorite: Optional[bool] = None
 
+class UserWordSkillUpsertData(BaseModel):
+    # 보낸 필드만 반영 (None 이면 기존 값 유지, 새 행이면 0)
+    word_id: str
+    skill_kanji: Optional[int] = None
+    skill_word_reading: Optional[int] = None
+    skill_word_speaking: Optional[int] = None
+    skill_sentence_reading: Optional[int] = None
+    skill_sentence_speaking: Optional[int] = None
+    skill_sentence_listening: Optional[int] = None
+    is_favorite: Optional[bool] = None
+    increment: bool = False  # True 이면 skill_* 값을 현재 값에 더함 (음수 가능, 결과는 0~100)
+    quality: Optional[int] = Field(None, ge=0, le=5)  # 복습 응답 품질 (SM-2, 0~5). 있으면 다음 복습 일정을 갱신
+
+class LearningEventData(BaseModel):
+    word_id: str
+    quiz_type: str  # kanji, word_reading, word_speaking, sentence_reading, sentence_speaking, sentence_listening
+    is_correct: bool
+    occurred_at: Optional[datetime] = None  # 없으면 서버 수신 시각
+
 class UserTextData(BaseModel):
     id: Optional[str] = None
     user_id: Optional[str] = None
@@ -53,6 +73,7 @@ class UserTextData(BaseModel):
 
 class TextData(BaseModel):
     text: str
+    format: Optional[str] = None  # "compact" 이면 단어 정보를 words 테이블로 한 번만 보냄
 
 class UserData(BaseModel):
     id: str
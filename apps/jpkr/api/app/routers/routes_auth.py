@@ -10,6 +10,7 @@ from google.auth.transport import requests as google_requests
 
 from models import UserData
 from settings import settings
+from utils.auth import load_principal, revoke_session
 from utils.auth_utils import random_urlsafe, pkce_challenge, hash_token, set_session_cookie, clear_session_cookie, set_return_to_cookie, pop_return_to_cookie
 from db import SessionLocal, User, Identity, Session as DbSession, OAuthState, UserRole  # 기존 db.py 모델 임포트
 
@@ -163,20 +164,15 @@ def check_user(request: Request, db: Session = Depends(get_db))->UserData:
     cookie = request.cookies.get(settings.session_cookie_name)
     if not cookie:
         raise HTTPException(401, "no session")
-    sid_hash = hash_token(cookie)
-    print(cookie, sid_hash)
-    sess = db.scalar(select(DbSession).where(DbSession.session_id_hash == sid_hash, DbSession.revoked_at.is_(None)))
-    if not sess:
+    principal = load_principal(db, hash_token(cookie))
+    if principal is None:
         raise HTTPException(401, "invalid session")
-    user = db.get(User, sess.user_id)
-    db.execute(update(DbSession).where(DbSession.id == sess.id).values(last_seen_at=func.now()))
-    db.commit()
     return UserData(
-        id=str(user.id),
-        email=user.email,
-        display_name=user.display_name,
-        picture_url=user.picture_url,
-        roles=[user_role.role.name for user_role in user.user_roles],
+        id=principal.id,
+        email=principal.email,
+        display_name=principal.display_name,
+        picture_url=principal.picture_url,
+        roles=principal.roles,
     )
 
 # 로그아웃
@@ -187,10 +183,6 @@ def logout(request: Request, db: Session = Depends(get_db)):
     if not cookie:
         clear_session_cookie(resp)
         return resp
-    sid_hash = hash_token(cookie)
-    sess = db.scalar(select(DbSession).where(DbSession.session_id_hash == sid_hash, DbSession.revoked_at.is_(None)))
-    if sess:
-        sess.revoked_at = func.now()
-        db.commit()
+    revoke_session(db, hash_token(cookie))
     clear_session_cookie(resp)
     return resp
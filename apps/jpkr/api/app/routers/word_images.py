@@ -4,7 +4,8 @@ from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from settings import settings
-from db import Word, WordImage
+from db import Word, WordImage, load_profile
+from service.word_cards import refresh_word_cards
 from models import WordImageOut
 from utils.aws_s3 import (
     is_allowed_content_type, build_object_key, upload_fileobj,
@@ -33,7 +34,7 @@ async def upload_word_image(
     user = Depends(get_current_user),
 ):
     # 1) 단어 존재/권한
-    word = db.execute(select(Word).where(Word.id == word_id)).scalar_one_or_none()
+    word = db.execute(select(Word).options(*load_profile(Word, "list")).where(Word.id == word_id)).scalar_one_or_none()
     if not word:
         raise HTTPException(404, detail="Word not found")
 
@@ -68,6 +69,7 @@ async def upload_word_image(
             size_bytes=len(contents)
         )
         db.add(wi)
+        refresh_word_cards([word_id], db)
         db.commit()
         db.refresh(wi)
     except Exception as e:
@@ -105,5 +107,6 @@ def delete_word_image(
     delete_object(wi.object_key)
 
     db.delete(wi)
+    refresh_word_cards([wi.word_id], db)
     db.commit()
     return
\ No newline at end of file
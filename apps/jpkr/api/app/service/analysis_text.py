@@ -1,147 +1,226 @@
 import re
+from contextlib import ExitStack
 from typing import List, Dict, Any
-from fugashi import Tagger
 from collections import defaultdict
-from db import SessionLocal, Word, Example
-from sqlalchemy.orm import selectinload
-from sqlalchemy import or_, select, case
+from db import SessionLocal, UserWordSkill
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from utils.aws_s3 import presign_get_url
+from utils.tagger_pool import acquire_tagger
+from utils.token_cache import line_token_cache, normalize_line, line_key
+from utils.executor import run_sync
+from service.word_index import word_index
+from service.word_cards import get_word_cards, get_word_cards_async
 
 def row_to_dict(obj) -> dict:
     # ORM 객체를 dict로 안전하게 변환
     return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
 
-def analyze_text(text: str, db: Session=None, user_id:str = None) -> Dict[str, Any]:
-    if db is None:
-        db = SessionLocal()
+def _tokenize_line(tagger, line: str) -> List[Dict[str, Any]]:
+    tokens = []
+    for i_word, word in enumerate(tagger(line)):
+        feat = word.feature
+        pos  = getattr(feat, "pos1", "")
+        #if pos in ["助詞", "記号", "助動詞","補助記号","接尾辞"]:
+        #    continue
+        tokens.append({
+            "i_word": i_word,
+            "surface": word.surface if getattr(feat, "lemma", None) != None else " "+word.surface,
+            "lemma": getattr(feat, "lemma", None),
+            "pos": pos,
+            "pos2": getattr(feat, "pos2", ""),
+            "pos3": getattr(feat, "pos3", ""),
+            "pos4": getattr(feat, "pos4", ""),
+            "cType": getattr(feat, "cType", ""),
+            "cForm": getattr(feat, "cForm", ""),
+            "reading": getattr(feat, "reading", ""),
+        })
+    return tokens
 
-    tagger = Tagger()  # unidic-lite 자동 사용    
+def tokenize_text(text: str) -> List[Dict[str, Any]]:
+    """
+    줄 단위로 형태소 분석. 같은 줄(정규화 기준)은 캐시에서 가져오고,
+    캐시에 없는 줄이 있을 때만 Tagger 풀에서 Tagger 를 빌린다.
+    """
     rows = []
-    word_list = []    
-    text_list = text.split("\n")
-    for i_line, text in enumerate(text_list):
-        text_words = tagger(text)
-        for i_word, word in enumerate(text_words):
-            feat = word.feature
-            pos  = getattr(feat, "pos1", "")
-            #if pos in ["助詞", "記号", "助動詞","補助記号","接尾辞"]:
-            #    continue
-            #if word.surface.strip() in word_list:
-            #    continue
-            rows.append({
-                "i_line": i_line,
-                "i_word": i_word,
-                "surface": word.surface if getattr(feat, "lemma", None) != None else " "+word.surface,
-                "lemma": getattr(feat, "lemma", None),
-                "pos": pos,
-                "pos2": getattr(feat, "pos2", ""),
-                "pos3": getattr(feat, "pos3", ""),
-                "pos4": getattr(feat, "pos4", ""),
-                "cType": getattr(feat, "cType", ""),
-                "cForm": getattr(feat, "cForm", ""),
-                "reading": getattr(feat, "reading", ""),
-            })
-            word_list.append(word.surface)
-        
-
-    # rows 에서 필요한 키들 수집 (중복 제거)
-    lemmas = [r["lemma"] for r in rows]
-    surfaces = [r["surface"] for r in rows]
-    stmt = (
-        select(Word)
-        .options(selectinload(Word.examples), 
-                 selectinload(Word.user_word_skills),
-                 selectinload(Word.images))
-        .where(
-            or_(
-                Word.word.in_(lemmas) if lemmas else False,
-                Word.jp_pronunciation.in_(surfaces) if surfaces else False,
-            )
-        )
-        .order_by(
-            case((Word.user_id == user_id, 0), else_=1)  # 내 것이 먼저 오게
-        )
-    )
-    words = db.execute(stmt).scalars().all()
-    # 그 다음엔 "처음 본 키만 채우기"만 해도 같은 효과
+    with ExitStack() as stack:
+        tagger = None
+        for i_line, line in enumerate(text.split("\n")):
+            line = normalize_line(line)
+            key = line_key(line)
+            tokens = line_token_cache.get(key)
+            if tokens is None:
+                if tagger is None:
+                    # 노드의 feature 는 다음 파싱 전에만 유효하므로 빌린 상태에서 모두 꺼내 둔다
+                    tagger = stack.enter_context(acquire_tagger())
+                tokens = _tokenize_line(tagger, line)
+                line_token_cache.put(key, tokens)
+            for token in tokens:
+                rows.append({"i_line": i_line, **token})
+    return rows
+
+def _resolve_word(entries, user_id: str = None):
+    """
+    같은 키(lemma 또는 읽기)로 찾은 단어들 중 대표 단어를 고르고 (내 것 우선, 없으면 먼저 등록된 것)
+    예문/이미지는 같은 키의 단어들 카드 (각각 root_word 사슬 포함) 것을 모두 합친다 → _merge_cards
+    """
+    primary = next((w for w in entries if user_id is not None and w.user_id == user_id), entries[0])
+    return primary, tuple(w.id for w in entries)
+
+def _card_word_ids(matched: List[Any]) -> List[str]:
+    return list({word_id for m in matched if m for word_id in m[1]})
+
+def _merge_cards(matched: List[Any], cards: Dict[str, Dict[str, Any]]) -> List[Any]:
+    # (대표 단어, 예문, 이미지 key) - 사슬이 겹치면 (분기와 루트가 같은 키) 같은 예문/이미지는 한 번만
+    merged = {}
+    result = []
+    for m in matched:
+        if not m:
+            result.append(m)
+            continue
+        primary, word_ids = m
+        if word_ids not in merged:
+            examples, image_keys, seen = [], [], set()
+            for word_id in word_ids:
+                card = cards.get(word_id, {})
+                for example in card.get("examples", ()):
+                    if example["id"] not in seen:
+                        seen.add(example["id"])
+                        examples.append(example)
+                for image in card.get("images", ()):
+                    if image["id"] not in seen:
+                        seen.add(image["id"])
+                        image_keys.append(image["object_key"])
+            merged[word_ids] = (examples, image_keys)
+        result.append((primary, *merged[word_ids]))
+    return result
+
+def _match_rows(rows: List[Dict[str, Any]], user_id: str = None) -> List[Any]:
+    # 원래 rows 순서를 유지하며 단어 매칭 (lemma 우선, 없으면 surface)
+    word_index.ensure_fresh()
     by_lemma, by_surface = {}, {}
-    for w in words:
-        if w.word and w.word not in by_lemma:
-            by_lemma[w.word] = row_to_dict(w)
-            by_lemma[w.word]["examples"] = []
-            by_lemma[w.word]["images"] = []
-            by_lemma[w.word]["user_word_skills"] = []
-            by_lemma[w.word]["user"] = row_to_dict(w.user)
-            for user_word_skill in w.user_word_skills:
-                by_lemma[w.word]["user_word_skills"].append(row_to_dict(user_word_skill))
-        for example in w.examples:
-            by_lemma[w.word]["examples"].append(row_to_dict(example))
-        for image in w.images:
-            by_lemma[w.word]["images"].append(presign_get_url(image.object_key, expires=600))
-
-        if w.jp_pronunciation and w.jp_pronunciation not in by_surface:
-            by_surface[w.jp_pronunciation] = row_to_dict(w)
-            by_surface[w.jp_pronunciation]["examples"] = []
-            by_surface[w.jp_pronunciation]["images"] = []
-            by_surface[w.jp_pronunciation]["user_word_skills"] = []
-            by_surface[w.jp_pronunciation]["user"] = row_to_dict(w.user)
-            for user_word_skill in w.user_word_skills:
-                by_surface[w.jp_pronunciation]["user_word_skills"].append(row_to_dict(user_word_skill))
-        for example in w.examples:
-            by_surface[w.jp_pronunciation]["examples"].append(row_to_dict(example))
-        for image in w.images:
-            by_surface[w.jp_pronunciation]["images"].append(presign_get_url(image.object_key, expires=600))
-
-
-    # 4) 원래 rows 순서를 유지하며 결과 구성 (lemma 우선, 없으면 surface)
-    words_result = defaultdict(list)
+    matched = []
     for r in rows:
-        w = by_lemma.get(r["lemma"])
-        if not w:
-            if len(r["surface"]) > 2:
-                w = by_surface.get(r["surface"])
-        if w:
-            examples_list = []
-            for example in w["examples"]:
-                examples_list.append({
-                    "id": example["id"],
-                    "word_info": w["word"],
-                    "tags": example["tags"],
-                    "jp_text": example["jp_text"],
-                    "kr_meaning": example["kr_meaning"],
-                })
-
-            user_word_skills_list = []
-            for user_word_skill in w["user_word_skills"]:
-                user_word_skills_list.append({
-                    "id": user_word_skill["id"],
-                    "skill_kanji": user_word_skill["skill_kanji"],
-                    "skill_word_reading": user_word_skill["skill_word_reading"],
-                    "skill_word_speaking": user_word_skill["skill_word_speaking"],
-                    "skill_sentence_reading": user_word_skill["skill_sentence_reading"],
-                    "skill_sentence_speaking": user_word_skill["skill_sentence_speaking"],
-                    "skill_sentence_listening": user_word_skill["skill_sentence_listening"],
-                    "is_favorite": user_word_skill["is_favorite"],
-                })
-            user_word_skills_list = sorted(user_word_skills_list, key=lambda x: x["skill_kanji"], reverse=True)
-            words_result[r["i_line"]].append({
-                "word_id": w["id"],
-                "word": w["word"],
-                "user_id": w["user_id"],
-                "user_display_name": w["user"]["display_name"],
-                "surface": r["surface"],
-                "jp_pronunciation": w["jp_pronunciation"],
-                "kr_pronunciation": w["kr_pronunciation"],
-                "kr_meaning": w["kr_meaning"],
-                "level": w["level"],
-                "examples": examples_list,
-                "num_examples": len(examples_list),
-                "user_word_skills": user_word_skills_list,
-                "num_user_word_skills": len(user_word_skills_list),
-                "images": w["images"],
-                "num_images": len(w["images"]),
-            })
+        lemma, surface = r["lemma"], r["surface"]
+        if lemma not in by_lemma:
+            entries = word_index.by_lemma(lemma) if lemma else None
+            by_lemma[lemma] = _resolve_word(entries, user_id) if entries else None
+        w = by_lemma[lemma]
+        if not w and len(surface) > 2:
+            if surface not in by_surface:
+                entries = word_index.by_reading(surface)
+                by_surface[surface] = _resolve_word(entries, user_id) if entries else None
+            w = by_surface[surface]
+        matched.append(w)
+    return matched
+
+def _user_skills_stmt(matched: List[Any], user_id: str):
+    # 사용자별 숙련도만 DB 에서 조회 (단어/예문/이미지는 인덱스에서)
+    word_ids = list({w[0].id for w in matched if w})
+    return (
+        select(UserWordSkill.word_id, UserWordSkill.id,
+               UserWordSkill.skill_kanji, UserWordSkill.skill_word_reading, UserWordSkill.skill_word_speaking,
+               UserWordSkill.skill_sentence_reading, UserWordSkill.skill_sentence_speaking,
+               UserWordSkill.skill_sentence_listening, UserWordSkill.is_favorite)
+        .where(UserWordSkill.user_id == user_id, UserWordSkill.word_id.in_(word_ids))
+    )
+
+def _group_skills(skill_rows) -> Dict[str, List[Dict[str, Any]]]:
+    skills_by_word = defaultdict(list)
+    for row in skill_rows:
+        skill = row._asdict()
+        skills_by_word[skill.pop("word_id")].append(skill)
+    return skills_by_word
+
+def _build_result(rows, matched, skills_by_word, format: str = None) -> Dict[str, Any]:
+    if format == "compact":
+        return _build_compact_result(rows, matched, skills_by_word)
+    return _build_words_result(rows, matched, skills_by_word)
+
+def analyze_text(text: str, format: str = None, db: Session=None, user_id:str = None) -> Dict[str, Any]:
+    if db is None:
+        db = SessionLocal()
+
+    rows = tokenize_text(text)
+    matched = _match_rows(rows, user_id)
+    cards = get_word_cards(_card_word_ids(matched), db)
+    skill_rows = []
+    if user_id is not None and any(matched):
+        skill_rows = db.execute(_user_skills_stmt(matched, user_id)).all()
+    return _build_result(rows, _merge_cards(matched, cards), _group_skills(skill_rows), format)
+
+async def analyze_text_async(text: str, format: str = None, db: AsyncSession=None, user_id:str = None) -> Dict[str, Any]:
+    # 형태소 분석과 인덱스 조회/결과 구성(presign 포함)은 스레드 풀에서, 카드/숙련도 조회만 비동기로
+    rows = await run_sync(tokenize_text, text)
+    matched = await run_sync(_match_rows, rows, user_id)
+    cards = await get_word_cards_async(_card_word_ids(matched), db)
+    skill_rows = []
+    if user_id is not None and any(matched):
+        skill_rows = (await db.execute(_user_skills_stmt(matched, user_id))).all()
+    return await run_sync(_build_result, rows, _merge_cards(matched, cards), _group_skills(skill_rows), format)
+
+def _word_payload(m, skills_by_word: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    # 매칭된 단어 하나의 정보 (surface 제외). 같은 단어가 여러 번 나와도 한 번만 만든다.
+    w, examples, image_keys = m
+    examples_list = []
+    for example in examples:
+        examples_list.append({
+            "id": example["id"],
+            "word_info": w.word,
+            "tags": example["tags"],
+            "jp_text": example["jp_text"],
+            "kr_meaning": example["kr_meaning"],
+        })
+    images = [presign_get_url(key, expires=600) for key in image_keys]
+    user_word_skills_list = sorted(skills_by_word.get(w.id, []), key=lambda x: x["skill_kanji"], reverse=True)
+    return {
+        "word_id": w.id,
+        "word": w.word,
+        "user_id": w.user_id,
+        "user_display_name": w.user_display_name,
+        "jp_pronunciation": w.jp_pronunciation,
+        "kr_pronunciation": w.kr_pronunciation,
+        "kr_meaning": w.kr_meaning,
+        "level": w.level,
+        "examples": examples_list,
+        "num_examples": len(examples_list),
+        "user_word_skills": user_word_skills_list,
+        "num_user_word_skills": len(user_word_skills_list),
+        "images": images,
+        "num_images": len(images),
+    }
+
+def _build_compact_result(rows: List[Dict[str, Any]], matched: List[Any], skills_by_word: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    format="compact" 응답
+    {
+        "format": "compact",
+        "words": { word_id: {word, jp_pronunciation, ..., examples, user_word_skills, images} },
+        "lines": { i_line: [ {"surface": ..., "word_id": ...} | {"surface": ..., "word": lemma, "word_id": None} ] }
+    }
+    """
+    words = {}
+    lines = defaultdict(list)
+    for r, m in zip(rows, matched):
+        if m:
+            word_id = m[0].id
+            if word_id not in words:
+                words[word_id] = _word_payload(m, skills_by_word)
+            lines[r["i_line"]].append({"surface": r["surface"], "word_id": word_id})
+        elif r["lemma"] != "":
+            lines[r["i_line"]].append({"surface": r["surface"], "word": r["lemma"], "word_id": None})
+    return {"format": "compact", "words": words, "lines": lines}
+
+def _build_words_result(rows: List[Dict[str, Any]], matched: List[Any], skills_by_word: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    words_result = defaultdict(list)
+    payloads = {}
+    for r, m in zip(rows, matched):
+        if m:
+            word_id = m[0].id
+            if word_id not in payloads:
+                payloads[word_id] = _word_payload(m, skills_by_word)
+            words_result[r["i_line"]].append({**payloads[word_id], "surface": r["surface"]})
         elif r["lemma"] != "":
             words_result[r["i_line"]].append({
                 "word_id": None,
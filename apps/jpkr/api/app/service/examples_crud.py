@@ -1,124 +1,164 @@
 # examples_crud.py
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, select, update, func, delete
 from typing import List, Dict, Any, Optional
-from db import SessionLocal, Example
+from db import SessionLocal, Example, Word, load_profile
 from models import ExampleData
-from sqlalchemy.orm import selectinload
+from service.word_cards import refresh_word_cards
+from utils.bulk import insert_with_ids
+from utils.paging import keyset_after, next_keyset_cursor, get_total_count, get_total_count_async
 
 def row_to_dict(obj) -> dict:
     # ORM 객체를 dict로 안전하게 변환
     return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
 
-def create_examples_batch(examples_data: List[ExampleData], db: Session=None, user_id:str = None):
-    for example_data in examples_data:
-        new_example = Example(
-            word_id=example_data.word_id,
-            tags=example_data.tags,
-            jp_text=example_data.jp_text,
-            kr_meaning=example_data.kr_meaning,
-            user_id=user_id
-        )            
-        db.add(new_example)
-        db.flush()  # ID 생성을 위해 flush                
+def create_examples_batch(examples_data: List[ExampleData], db: Session=None, user_id:str = None) -> List[str]:
+    # 한 문장(큰 입력은 chunk 별)으로 넣는다. id 는 insert_with_ids 가 미리 만들어 넣으므로 입력 순서대로 반환
+    rows = [
+        {
+            "word_id": example_data.word_id,
+            "tags": example_data.tags,
+            "jp_text": example_data.jp_text,
+            "kr_meaning": example_data.kr_meaning,
+            "user_id": user_id,
+        }
+        for example_data in examples_data
+    ]
+    ids = insert_with_ids(db, Example, rows)
+    refresh_word_cards({example_data.word_id for example_data in examples_data}, db)
     db.commit()
-    return
+    return ids
 
 
 def update_examples_batch(examples_data: List[ExampleData], db: Session=None, user_id:str = None):
+    # 대상 예문을 한 번에 확인하고, 변경은 id 기준 executemany UPDATE 한 번으로
+    ids = {example_data.id for example_data in examples_data}
+    old_word_ids = dict(db.execute(select(Example.id, Example.word_id).where(Example.id.in_(ids))).all())
+    params = {}
     for example_data in examples_data:
-        example = db.query(Example).filter(Example.id == example_data.id).first()            
-        if example:
-            # 예문 데이터 업데이트
-            example.word_id = example_data.word_id
-            example.tags = example_data.tags
-            example.jp_text = example_data.jp_text
-            example.kr_meaning = example_data.kr_meaning
-            example.user_id = user_id
-        else:
+        if example_data.id not in old_word_ids:
             # 해당 ID의 예문이 없는 경우
-            raise Exception("Example not found")        
+            raise Exception("Example not found")
+        # 예문 데이터 업데이트
+        params[example_data.id] = {
+            "id": example_data.id,
+            "word_id": example_data.word_id,
+            "tags": example_data.tags,
+            "jp_text": example_data.jp_text,
+            "kr_meaning": example_data.kr_meaning,
+            "user_id": user_id,
+        }
+    if params:
+        db.execute(update(Example), list(params.values()))
+    changed_word_ids = set(old_word_ids.values()) | {p["word_id"] for p in params.values()}
+    refresh_word_cards(changed_word_ids, db)
     db.commit()
     return
         
 
 def delete_examples_batch(example_ids: List[int], db: Session=None, user_id:str = None):
-    deleted_count = db.query(Example).filter(Example.id.in_(example_ids)).delete(synchronize_session=False)
+    stmt = delete(Example).where(Example.id.in_(example_ids)).returning(Example.word_id)
+    changed_word_ids = db.execute(stmt).scalars().all()
+    deleted_count = len(changed_word_ids)
+    refresh_word_cards(changed_word_ids, db)
     db.commit()
     print(f"총 {deleted_count}개의 예문을 일괄 삭제했습니다.")
     return deleted_count                
 
 
-def search_examples_by_text(search_term: str, db: Session=None, user_id:str = None) -> List[Dict[str, Any]]:
+def _example_to_row(example) -> Dict[str, Any]:
+    return {
+        "id": example.id,
+        "word_id": example.word_id,
+        "word_info": example.word.word,
+        "tags": example.tags,
+        "jp_text": example.jp_text,
+        "kr_meaning": example.kr_meaning,
+    }
+
+def _search_examples_stmt(search_term: str):
     # jp_text, kr_meaning, tags 중 하나라도 일치하는 경우 검색
     search_pattern = f"%{search_term}%"
-    
-    found_examples = db.query(Example).filter(
+    return select(Example).options(*load_profile(Example, "list")).where(
         or_(
             Example.jp_text.like(search_pattern),
             Example.kr_meaning.like(search_pattern),
             Example.tags.like(search_pattern)
         )
-    ).all()
-    
-    result = []
-    for example in found_examples:
-        result.append({
-            "id": example.id,
-            "word_id": example.word_id,
-            "word_info": example.word.word,
-            "tags": example.tags,
-            "jp_text": example.jp_text,
-            "kr_meaning": example.kr_meaning,
-        })
-    
+    )
+
+def _examples_by_word_id_stmt(word_id):
+    return select(Example).options(*load_profile(Example, "list")).where(Example.word_id == word_id)
+
+def _all_examples_stmt(limit: Optional[int], offset: Optional[int], cursor: Optional[str]):
+    # (created_at, id) 순 예문 페이지. cursor 가 None 이면 offset, 문자열이면 ("" = 첫 페이지) keyset
+    stmt = (
+        select(Example.id, Example.word_id, Word.word.label("word_info"), Example.tags,
+               Example.jp_text, Example.kr_meaning, Example.created_at)
+        .join(Word, Word.id == Example.word_id)
+        .order_by(Example.created_at, Example.id)
+    )
+    if cursor is not None:
+        after = keyset_after(Example.created_at, Example.id, cursor)
+        if after is not None:
+            stmt = stmt.where(after)
+        if limit:
+            stmt = stmt.limit(limit + 1)  # 다음 페이지 유무 확인용 1개 더
+    else:
+        if offset:
+            stmt = stmt.offset(offset)
+        if limit:
+            stmt = stmt.limit(limit)
+    return stmt
+
+def _all_examples_result(rows, total_count, limit, offset, cursor) -> Dict[str, Any]:
+    examples = [row._asdict() for row in rows]
+    result = {"total_count": total_count}
+    if cursor is not None:
+        examples, next_cursor = next_keyset_cursor(examples, limit)
+        result.update({"examples": examples, "limit": limit, "next_cursor": next_cursor})
+    else:
+        result.update({"examples": examples, "limit": limit, "offset": offset})
+    for example in examples:
+        example.pop("created_at")
     return result
+
+
+def search_examples_by_text(search_term: str, db: Session=None, user_id:str = None) -> List[Dict[str, Any]]:
+    found_examples = db.execute(_search_examples_stmt(search_term)).scalars().all()
+    return [_example_to_row(example) for example in found_examples]
         
 
 def get_examples_by_word_id(word_id: int, db: Session=None, user_id:str = None) -> List[Dict[str, Any]]:
-    examples = db.query(Example).filter(Example.word_id == word_id).all()
-    
-    result = []
-    for example in examples:
-        result.append({
-            "id": example.id,
-            "word_id": example.word_id,
-            "word_info": example.word.word,
-            "tags": example.tags,
-            "jp_text": example.jp_text,
-            "kr_meaning": example.kr_meaning,
-        })
-    
-    return result
+    examples = db.execute(_examples_by_word_id_stmt(word_id)).scalars().all()
+    return [_example_to_row(example) for example in examples]
         
 
-def get_all_examples(limit: Optional[int] = None, offset: Optional[int] = None, db: Session=None, user_id:str = None) -> Dict[str, Any]:
-    total_count = db.query(Example).count()
+def get_all_examples(limit: Optional[int] = None, offset: Optional[int] = None, cursor: Optional[str] = None, total: Optional[str] = None,
+                     db: Session=None, user_id:str = None) -> Dict[str, Any]:
+    # total 기본값: offset 방식은 예전처럼 exact, cursor 방식은 estimated
+    total_count = get_total_count(db, Example, total or ("exact" if cursor is None else "estimated"))
+    rows = db.execute(_all_examples_stmt(limit, offset, cursor)).all()
+    return _all_examples_result(rows, total_count, limit, offset, cursor)
 
-    query = db.query(Example)
-    if offset:
-        query = query.offset(offset)
-    if limit:
-        query = query.limit(limit)
-    examples = query.all()
 
-    result_examples = []
-    for example in examples:
-        result_examples.append({
-            "id": example.id,
-            "word_id": example.word_id,
-            "word_info": example.word.word,
-            "tags": example.tags,
-            "jp_text": example.jp_text,
-            "kr_meaning": example.kr_meaning,
-        })
-    
-    return {
-        "total_count": total_count,
-        "examples": result_examples,
-        "limit": limit,
-        "offset": offset
-    }
+# ---------------------------------------------------------------------
+# AsyncSession 버전 (조회 전용)
+# ---------------------------------------------------------------------
+async def search_examples_by_text_async(search_term: str, db: AsyncSession=None, user_id:str = None) -> List[Dict[str, Any]]:
+    found_examples = (await db.execute(_search_examples_stmt(search_term))).scalars().all()
+    return [_example_to_row(example) for example in found_examples]
+
+
+async def get_examples_by_word_id_async(word_id: int, db: AsyncSession=None, user_id:str = None) -> List[Dict[str, Any]]:
+    examples = (await db.execute(_examples_by_word_id_stmt(word_id))).scalars().all()
+    return [_example_to_row(example) for example in examples]
 
 
+async def get_all_examples_async(limit: Optional[int] = None, offset: Optional[int] = None, cursor: Optional[str] = None, total: Optional[str] = None,
+                                 db: AsyncSession=None, user_id:str = None) -> Dict[str, Any]:
+    total_count = await get_total_count_async(db, Example, total or ("exact" if cursor is None else "estimated"))
+    rows = (await db.execute(_all_examples_stmt(limit, offset, cursor))).all()
+    return _all_examples_result(rows, total_count, limit, offset, cursor)
@@ -0,0 +1,311 @@
+# learning_events.py
+import uuid
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Any, Optional
+from fastapi import HTTPException
+from sqlalchemy import select, update, func, case, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from settings import settings
+from db import SessionLocal, LearningEvent, LearningEventWatermark, Word, User
+from models import LearningEventData, UserWordSkillUpsertData
+from service.user_word_skill import SKILL_FIELDS, merge_skill_upserts, upsert_user_word_skills_stmt
+from utils.bulk import insert_rows
+
+# 퀴즈 응답은 learning_events 에 쌓기만 하고 (요청마다 user_word_skills 를 갱신하지 않음)
+#  - LearningEventBuffer : 워커 메모리에 모았다가 개수/시간 기준으로 multi-row INSERT
+#  - LearningAggregator  : 주기적으로 watermark 이후 이벤트를 (사용자, 단어, 유형) 별 증가량으로 합쳐 숙련도 upsert
+
+QUIZ_TYPES = {field[len("skill_"):]: field for field in SKILL_FIELDS}  # "kanji" → "skill_kanji"
+AGGREGATOR_NAME = "user_word_skills"
+
+
+class LearningEventBuffer:
+    def __init__(self, flush_size: int, interval_seconds: float, max_size: int):
+        self.flush_size = max(1, int(flush_size))
+        self.interval_seconds = max(0.0, float(interval_seconds))
+        self.max_size = max(self.flush_size, int(max_size))
+        self._rows: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # flush 는 한 번에 하나씩 (실패 시 되돌려 넣는 순서 유지)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # metrics
+        self._received = 0
+        self._flushes = 0
+        self._flushed_rows = 0
+        self._errors = 0
+        self._rejected = 0
+
+    def add(self, rows: List[Dict[str, Any]]) -> int:
+        if self._thread is None:
+            # 백그라운드 스레드가 없으면 (스크립트, 설정으로 끔) 바로 기록
+            # 버퍼에 남기지 않고 실패를 그대로 알린다 (실패로 응답한 행이 나중에 기록되면 재시도 시 중복)
+            with self._lock:
+                self._received += len(rows)
+            try:
+                with self._flush_lock:
+                    self._write(rows)
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                print("learning_events write failed:", e)
+                raise HTTPException(status_code=503, detail="Learning events could not be recorded") from e
+            return len(rows)
+        if self._pending() + len(rows) > self.max_size:
+            # 버퍼가 가득 차면 요청 스레드에서 먼저 비우고, 그래도 못 비우면 (DB 장애 등) 거절
+            self.flush()
+            if self._pending() + len(rows) > self.max_size:
+                with self._lock:
+                    self._rejected += len(rows)
+                raise HTTPException(status_code=503, detail="Learning event buffer is full")
+        if self._append(rows) >= self.flush_size:
+            self._wake.set()
+        return len(rows)
+
+    def _append(self, rows: List[Dict[str, Any]]) -> int:
+        with self._lock:
+            self._rows.extend(rows)
+            self._received += len(rows)
+            return len(self._rows)
+
+    def _pending(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            try:
+                self._write(rows)
+            except Exception as e:
+                # 다음 주기에 다시 (앞쪽에 되돌려 넣어 순서 유지)
+                with self._lock:
+                    self._rows[:0] = rows
+                    self._errors += 1
+                print("learning_events flush failed:", e)
+                return 0
+            return len(rows)
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        # _flush_lock 을 잡은 상태에서 호출
+        if not rows:
+            return
+        with SessionLocal() as db:
+            insert_rows(db, LearningEvent, rows)
+            db.commit()
+        with self._lock:
+            self._flushes += 1
+            self._flushed_rows += len(rows)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def start(self):
+        if self.interval_seconds <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="learning-event-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # 종료 시 남은 것까지 기록
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._rows),
+                "flush_size": self.flush_size,
+                "interval_seconds": self.interval_seconds,
+                "max_size": self.max_size,
+                "received": self._received,
+                "flushes": self._flushes,
+                "flushed_rows": self._flushed_rows,
+                "errors": self._errors,
+                "rejected": self._rejected,
+            }
+
+
+def _event_delta():
+    return case((LearningEvent.is_correct, settings.LEARNING_CORRECT_DELTA), else_=settings.LEARNING_WRONG_DELTA)
+
+def _aggregate_upper_bound(db: Session, last_id: int, limit: int, lag_seconds: int) -> Optional[int]:
+    """
+    이번에 반영할 마지막 이벤트 id
+    LAG 보다 최근에 들어온 이벤트가 있으면 그 앞에서 멈춘다.
+    (id 는 커밋 순서가 아니라 할당 순서라서, 최근 구간에는 아직 커밋 안 된 낮은 id 가 있을 수 있음)
+    """
+    cutoff = func.now() - timedelta(seconds=lag_seconds)
+    first_recent = (
+        select(func.min(LearningEvent.id))
+        .where(LearningEvent.id > last_id, LearningEvent.created_at >= cutoff)
+        .scalar_subquery()
+    )
+    ids = (
+        select(LearningEvent.id)
+        .where(LearningEvent.id > last_id, or_(first_recent.is_(None), LearningEvent.id < first_recent))
+        .order_by(LearningEvent.id)
+        .limit(limit)
+        .subquery()
+    )
+    return db.execute(select(func.max(ids.c.id))).scalar()
+
+def aggregate_learning_events(db: Session, limit: int = None, lag_seconds: int = None) -> Dict[str, Any]:
+    """
+    watermark 이후의 이벤트를 user_word_skills 에 반영하고 watermark 를 옮긴다 (한 트랜잭션)
+    watermark 행을 FOR UPDATE SKIP LOCKED 로 잡으므로 워커가 여럿이어도 한 번에 하나만 진행한다.
+    증가량은 (사용자, 단어, 유형) 별로 합친 뒤 한 번에 0~100 으로 자른다.
+    """
+    limit = limit or settings.LEARNING_AGGREGATE_BATCH
+    lag_seconds = settings.LEARNING_AGGREGATE_LAG_SECONDS if lag_seconds is None else lag_seconds
+
+    db.execute(pg_insert(LearningEventWatermark).values(name=AGGREGATOR_NAME).on_conflict_do_nothing())
+    last_id = db.execute(
+        select(LearningEventWatermark.last_event_id)
+        .where(LearningEventWatermark.name == AGGREGATOR_NAME)
+        .with_for_update(skip_locked=True)
+    ).scalar()
+    if last_id is None:
+        # 다른 워커가 집계 중
+        db.rollback()
+        return {"skipped": True}
+
+    upper = _aggregate_upper_bound(db, last_id, limit, lag_seconds)
+    if upper is None:
+        db.rollback()
+        return {"events_through": last_id, "users": 0, "skills": 0}
+
+    rows = db.execute(
+        select(
+            LearningEvent.user_id, LearningEvent.word_id, LearningEvent.quiz_type,
+            func.sum(_event_delta()).label("delta"),
+            func.count().label("answers"),
+            func.count().filter(LearningEvent.is_correct).label("correct"),
+        )
+        .join(Word, Word.id == LearningEvent.word_id)  # 그 사이 삭제된 단어/사용자는 건너뜀
+        .join(User, User.id == LearningEvent.user_id)
+        .where(LearningEvent.id > last_id, LearningEvent.id <= upper)
+        .group_by(LearningEvent.user_id, LearningEvent.word_id, LearningEvent.quiz_type)
+    ).all()
+    by_user = defaultdict(list)
+    answers = defaultdict(lambda: [0, 0])  # (user_id, word_id) -> [정답 수, 응답 수]
+    for row in rows:
+        field = QUIZ_TYPES.get(row.quiz_type)
+        if field is not None:
+            by_user[row.user_id].append(UserWordSkillUpsertData(word_id=row.word_id, increment=True, **{field: int(row.delta)}))
+            answers[(row.user_id, row.word_id)][0] += row.correct
+            answers[(row.user_id, row.word_id)][1] += row.answers
+    for user_id, items in by_user.items():
+        # 이번 묶음을 단어별 복습 한 번으로 보고 정답 비율로 SM-2 quality(0~5) 를 정한다
+        for word_id in {item.word_id for item in items}:
+            correct, total = answers[(user_id, word_id)]
+            items.append(UserWordSkillUpsertData(word_id=word_id, quality=round(5 * correct / total)))
+        db.execute(upsert_user_word_skills_stmt(merge_skill_upserts(items), user_id))
+
+    db.execute(
+        update(LearningEventWatermark)
+        .where(LearningEventWatermark.name == AGGREGATOR_NAME)
+        .values(last_event_id=upper, updated_at=func.now())
+    )
+    db.commit()
+    return {"events_through": upper, "users": len(by_user), "skills": len(rows)}
+
+
+class LearningAggregator:
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = max(0.0, float(interval_seconds))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # metrics
+        self._runs = 0
+        self._errors = 0
+        self._last: Dict[str, Any] = {}
+
+    def run_once(self) -> Dict[str, Any]:
+        try:
+            with SessionLocal() as db:
+                result = aggregate_learning_events(db)
+        except Exception as e:
+            with self._lock:
+                self._errors += 1
+            print("learning_events aggregate failed:", e)
+            return {"error": str(e)}
+        with self._lock:
+            self._runs += 1
+            self._last = result
+        return result
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.run_once()
+
+    def start(self):
+        if self.interval_seconds <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="learning-aggregator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "interval_seconds": self.interval_seconds,
+                "runs": self._runs,
+                "errors": self._errors,
+                "last": self._last,
+            }
+
+
+learning_event_buffer = LearningEventBuffer(
+    settings.LEARNING_EVENT_FLUSH_SIZE, settings.LEARNING_EVENT_FLUSH_INTERVAL_SECONDS, settings.LEARNING_EVENT_BUFFER_MAX
+)
+learning_aggregator = LearningAggregator(settings.LEARNING_AGGREGATE_INTERVAL_SECONDS)
+
+
+def ingest_learning_events(events: List[LearningEventData], db: Session=None, user_id:str = None) -> Dict[str, int]:
+    """
+    퀴즈 응답 묶음을 버퍼에 넣고 바로 반환 (DB 기록은 버퍼가, 숙련도 반영은 집계기가)
+    잘못된 항목이 하나라도 있으면 묶음 전체를 400 으로 거절 (버퍼 flush 가 실패하지 않도록)
+    """
+    received_at = datetime.now(timezone.utc)
+    rows = []
+    for event in events:
+        if event.quiz_type not in QUIZ_TYPES:
+            raise HTTPException(status_code=400, detail=f"Unknown quiz_type: {event.quiz_type}")
+        try:
+            word_id = str(uuid.UUID(event.word_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid word_id: {event.word_id}")
+        rows.append({
+            "user_id": user_id,
+            "word_id": word_id,
+            "quiz_type": event.quiz_type,
+            "is_correct": event.is_correct,
+            "occurred_at": event.occurred_at or received_at,
+        })
+    if rows:
+        learning_event_buffer.add(rows)
+    return {"accepted": len(rows)}
@@ -0,0 +1,25 @@
+# server_metrics.py
+from typing import Dict, Any
+from sqlalchemy.orm import Session
+from utils.tagger_pool import get_tagger_pool_stats
+from utils.token_cache import line_token_cache
+from utils.executor import get_service_executor_stats
+from utils.aws_s3 import presign_cache
+from utils.session_cache import session_cache, last_seen_flusher
+from service.word_index import word_index
+from service.learning_events import learning_event_buffer, learning_aggregator
+
+
+def get_server_metrics(db: Session=None, user_id:str = None) -> Dict[str, Any]:
+    # 워커 프로세스 단위의 내부 지표 (uvicorn 워커가 여러 개면 워커별로 다름)
+    return {
+        "tagger_pool": get_tagger_pool_stats(),
+        "line_token_cache": line_token_cache.stats(),
+        "service_executor": get_service_executor_stats(),
+        "word_index": word_index.stats(),
+        "presign_cache": presign_cache.stats(),
+        "session_cache": session_cache.stats(),
+        "last_seen_flusher": last_seen_flusher.stats(),
+        "learning_event_buffer": learning_event_buffer.stats(),
+        "learning_aggregator": learning_aggregator.stats(),
+    }
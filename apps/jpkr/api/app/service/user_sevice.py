@@ -1,8 +1,9 @@
 from typing import Optional, Dict, Any, List
 from sqlalchemy.orm import Session, load_only
 from sqlalchemy import select, func
-from db import User, Word, Example, WordImage, UserText, UserWordSkill, UserRole
+from db import User, Word, Example, WordImage, UserText, UserWordSkill, UserRole, load_profile
 from utils.aws_s3 import presign_get_url
+from service.word_chain import resolve_word_chains
 
 class UserService:
     """사용자와 연관된 모든 데이터를 가져오는 서비스"""
@@ -14,7 +15,7 @@ class UserService:
         """
         try:
             print(offset, limit)
-            stmt = select(User)
+            stmt = select(User).options(*load_profile(User, "list"))
             if offset is not None:
                 stmt = stmt.offset(offset)
             if limit is not None:
@@ -57,12 +58,14 @@ class UserService:
 
         try:
             # User 테이블을 기준으로 모든 relationship 데이터를 한 번에 가져옴
-            # lazy="selectin" 설정으로 인해 JOIN 쿼리가 자동으로 실행됨
-            stmt = select(User).where(User.id == id_to_get)
+            # ("export" 프로필: 관계별 selectin 쿼리 1회씩, 연결 단어는 이름만)
+            stmt = select(User).options(*load_profile(User, "export")).where(User.id == id_to_get)
             user = db.execute(stmt).scalar_one_or_none()
             
             if not user:
                 return None
+            # 분기 단어의 root_word 사슬 예문/이미지 (재귀 CTE 한 번)
+            chains = resolve_word_chains([word.id for word in user.words if word.root_word_id], db)
             
             # 사용자 데이터를 딕셔너리로 변환
             user_data = {
@@ -93,7 +96,21 @@ class UserService:
                         "kr_meaning": word.kr_meaning,
                         "level": word.level,
                         "created_at": word.created_at,
-                        "updated_at": word.updated_at
+                        "updated_at": word.updated_at,
+                        # 분기 단어가 root_word 사슬에서 물려받은 예문/이미지 (자기 것은 아래 examples/images 에 있음)
+                        "root_examples": [
+                            example for example in chains.get(word.id, {}).get("examples", []) if example["depth"] > 0
+                        ],
+                        "root_images": [
+                            {
+                                "id": image["id"],
+                                "word_id": image["word_id"],
+                                "tags": image["tags"],
+                                "image_url": presign_get_url(image["object_key"], expires=600),
+                                "depth": image["depth"],
+                            }
+                            for image in chains.get(word.id, {}).get("images", []) if image["depth"] > 0
+                        ],
                     }
                     for word in user.words
                 ],
@@ -5,7 +5,7 @@ from typing import List, Dict, Any, Optional, Sequence
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from models import UserTextData
-from db import SessionLocal, UserText
+from db import SessionLocal, UserText, load_profile
 from datetime import datetime
 
 
@@ -28,7 +28,7 @@ def create_user_text(user_text_data: UserTextData, db: Session, user_id: Optiona
     return row_to_dict(user_text)
 
 def get_user_text(user_text_id: str, db: Session, user_id: str) -> UserTextData:
-    user_text = db.query(UserText).filter(UserText.id == user_text_id).first()
+    user_text = db.query(UserText).options(*load_profile(UserText, "list")).filter(UserText.id == user_text_id).first()
     if user_text:
         return UserTextData(**row_to_dict(user_text))
     else:
@@ -36,7 +36,7 @@ def get_user_text(user_text_id: str, db: Session, user_id: str) -> UserTextData:
 
 def get_user_text_list(limit, offset, db: Session = None, user_id: str = None) -> Dict[str, Any]:
     total_count = db.query(UserText).filter(UserText.user_id == user_id).count()
-    query = db.query(UserText).filter(UserText.user_id == user_id)
+    query = db.query(UserText).options(*load_profile(UserText, "list")).filter(UserText.user_id == user_id)
     if limit:
         query = query.limit(limit)
     if offset:
@@ -51,7 +51,7 @@ def get_user_text_list(limit, offset, db: Session = None, user_id: str = None) -
 
 def update_user_text(user_text_data: UserTextData, db: Session=None, user_id:str = None) -> Dict[int, Dict[str, Any]]:
     result = {}        
-    user_text = db.query(UserText).filter(UserText.id == user_text_data.id).first()
+    user_text = db.query(UserText).options(*load_profile(UserText, "list")).filter(UserText.id == user_text_data.id).first()
     if user_text:
         for key, value in user_text_data.model_dump().items():
             if value and key != "id":
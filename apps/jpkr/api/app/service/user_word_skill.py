@@ -1,37 +1,37 @@
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, select, func, values, column, cast, case, literal, literal_column, null, Integer, Float, Boolean
+from sqlalchemy.dialects.postgresql import UUID, insert as pg_insert
 from typing import List, Dict, Any, Optional
-from db import SessionLocal, UserWordSkill
-from models import UserWordSkillData
-from sqlalchemy.orm import selectinload
+from db import SessionLocal, UserWordSkill, load_profile
+from models import UserWordSkillData, UserWordSkillUpsertData
 
 
 def create_user_word_skill_batch(user_word_skill_data: List[UserWordSkillData], db: Session=None, user_id:str = None):
     """
-    여러 단어 숙련도를 한 번에 생성합니다.
+    여러 단어 숙련도를 한 번에 생성합니다. (upsert 와 같은 문장 - 이미 있으면 보낸 값으로 덮어씀, 복습 일정도 함께 갱신)
     Args:
         user_word_skill_data: 단어 숙련도 데이터 리스트 [UserWordSkillData]    
+    Returns:
+        생성된 숙련도 id 리스트 (입력 순서)
     """
     if db is None:
         db = SessionLocal()
     try:
-        for user_word_skill_data in user_word_skill_data:
-            new_user_word_skill = UserWordSkill(
-                word_id=user_word_skill_data.word_id,
-                skill_kanji=user_word_skill_data.skill_kanji if user_word_skill_data.skill_kanji is not None else 0,
-                skill_word_reading=user_word_skill_data.skill_word_reading if user_word_skill_data.skill_word_reading is not None else 0,
-                skill_word_speaking=user_word_skill_data.skill_word_speaking if user_word_skill_data.skill_word_speaking is not None else 0,
-                skill_sentence_reading=user_word_skill_data.skill_sentence_reading if user_word_skill_data.skill_sentence_reading is not None else 0,
-                skill_sentence_speaking=user_word_skill_data.skill_sentence_speaking if user_word_skill_data.skill_sentence_speaking is not None else 0,
-                skill_sentence_listening=user_word_skill_data.skill_sentence_listening if user_word_skill_data.skill_sentence_listening is not None else 0,
-                is_favorite=user_word_skill_data.is_favorite if user_word_skill_data.is_favorite is not None else False,
-                user_id=user_id
-            )            
-            db.add(new_user_word_skill)
-            db.flush()  # ID 생성을 위해 flush                
+        if not user_word_skill_data:
+            return []
+        items = [
+            UserWordSkillUpsertData(
+                word_id=data.word_id,
+                **{field: getattr(data, field) if getattr(data, field) is not None else 0 for field in SKILL_FIELDS},
+                is_favorite=data.is_favorite if data.is_favorite is not None else False,
+            )
+            for data in user_word_skill_data
+        ]
+        ids = {row.word_id: row.id for row in db.execute(upsert_user_word_skills_stmt(merge_skill_upserts(items), user_id))}
         db.commit()
-        return
+        return [ids[data.word_id] for data in user_word_skill_data]
         
     except Exception as e:
         db.rollback()
@@ -40,38 +40,42 @@ def create_user_word_skill_batch(user_word_skill_data: List[UserWordSkillData],
         db.close()
 
 
-def update_user_word_skill_batch(user_word_skill_data: List[UserWordSkillData], db: Session=None, user_id:str = None):
+def update_user_word_skill_batch(user_word_skill_data: List[UserWordSkillData], db: Session=None, user_id:str = None) -> Dict[str, Dict[str, Any]]:
     """
-    여러 단어 숙련도를 한 번에 업데이트합니다.
+    여러 단어 숙련도를 한 번에 업데이트합니다. (보낸 필드만 변경, 숙련도가 바뀌면 복습 일정도 갱신)
     
     Args:
         user_word_skill_data: 업데이트할 단어 숙련도 데이터 [UserWordSkillData]
+    Returns:
+        { id: {skill_*, is_favorite, due_at, ...} 또는 {"error": ...} }
     """
     if db is None:
         db = SessionLocal()
     try:
-        user_word_skill_ids = [user_word_skill_data.id for user_word_skill_data in user_word_skill_data]
-        user_word_skills = db.query(UserWordSkill).filter(UserWordSkill.id.in_(user_word_skill_ids)).all()
-        for user_word_skill in user_word_skills:
-            if user_word_skill.word_id is not None:
-                user_word_skill.word_id = user_word_skill.word_id
-            if user_word_skill.skill_kanji is not None:
-                user_word_skill.skill_kanji = user_word_skill.skill_kanji
-            if user_word_skill.skill_word_reading is not None:
-                user_word_skill.skill_word_reading = user_word_skill.skill_word_reading
-            if user_word_skill.skill_word_speaking is not None:
-                user_word_skill.skill_word_speaking = user_word_skill.skill_word_speaking
-            if user_word_skill.skill_sentence_reading is not None:
-                user_word_skill.skill_sentence_reading = user_word_skill.skill_sentence_reading
-            if user_word_skill.skill_sentence_speaking is not None:
-                user_word_skill.skill_sentence_speaking = user_word_skill.skill_sentence_speaking
-            if user_word_skill.skill_sentence_listening is not None:
-                user_word_skill.skill_sentence_listening = user_word_skill.skill_sentence_listening
-            if user_word_skill.is_favorite is not None:
-                user_word_skill.is_favorite = user_word_skill.is_favorite
-            user_word_skill.user_id = user_id
+        ids = {data.id for data in user_word_skill_data if data.id is not None}
+        word_ids = dict(db.execute(
+            select(UserWordSkill.id, UserWordSkill.word_id).where(UserWordSkill.user_id == user_id, UserWordSkill.id.in_(ids))
+        ).all()) if ids else {}
+        result = {}
+        items = []
+        for data in user_word_skill_data:
+            word_id = word_ids.get(data.id)
+            if word_id is None:
+                result[data.id] = {"error": "User word skill not found"}
+                continue
+            if data.word_id != word_id:
+                # 숙련도 행은 (user_id, word_id) 로 식별되므로 다른 단어로 옮기지 않는다
+                result[data.id] = {"error": "word_id cannot be changed"}
+                continue
+            fields = {field: getattr(data, field) for field in (*SKILL_FIELDS, "is_favorite") if getattr(data, field) is not None}
+            items.append(UserWordSkillUpsertData(word_id=word_id, **fields))
+        if items:
+            for row in db.execute(upsert_user_word_skills_stmt(merge_skill_upserts(items), user_id)).mappings():
+                row = dict(row)
+                row.pop("created")
+                result[row.pop("id")] = row
         db.commit()
-        return
+        return result
         
     except Exception as e:
         db.rollback()
@@ -79,6 +83,163 @@ def update_user_word_skill_batch(user_word_skill_data: List[UserWordSkillData],
     finally:
         db.close()
 
+SKILL_FIELDS = (
+    "skill_kanji", "skill_word_reading", "skill_word_speaking",
+    "skill_sentence_reading", "skill_sentence_speaking", "skill_sentence_listening",
+)
+SKILL_MIN, SKILL_MAX = 0, 100
+
+def _clamp_skill(expr):
+    return func.least(SKILL_MAX, func.greatest(SKILL_MIN, expr))
+
+# 복습 일정 (SM-2)
+#  - quality 3 이상: 반복 횟수 +1, 간격 1일 → 6일 → 이전 간격 × ease
+#  - quality 3 미만: 반복 횟수 0, 간격 1일 (처음부터 다시)
+#  - ease 는 quality 에 따라 조정, 최소 1.3
+SM2_MIN_EASE = 1.3
+SCHEDULE_FIELDS = ("due_at", "interval_days", "ease", "repetitions", "last_reviewed_at")
+# 새 행의 일정 (바로 복습 대상) - db.UserWordSkill 의 server_default 와 같은 값
+SM2_INITIAL = {
+    "due_at": func.now(),
+    "interval_days": literal(0, Integer),
+    "ease": literal(2.5, Float),
+    "repetitions": literal(0, Integer),
+    "last_reviewed_at": null(),
+}
+
+def sm2_schedule(quality, current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    quality(0~5) 와 현재 일정(SQL 식)으로 다음 일정 SQL 식을 만든다.
+    quality 가 NULL 이면 현재 값 그대로.
+    """
+    passed = quality >= 3
+    miss = 5 - quality
+    repetitions, interval_days, ease = current["repetitions"], current["interval_days"], current["ease"]
+    next_interval = case(
+        (~passed, 1),
+        (repetitions == 0, 1),
+        (repetitions == 1, 6),
+        else_=func.greatest(1, cast(func.round(interval_days * ease), Integer)),
+    )
+    next_values = {
+        "due_at": func.now() + next_interval * literal_column("interval '1 day'"),
+        "interval_days": next_interval,
+        "ease": func.greatest(SM2_MIN_EASE, ease + (0.1 - miss * (0.08 + miss * 0.02))),
+        "repetitions": case((passed, repetitions + 1), else_=0),
+        "last_reviewed_at": func.now(),
+    }
+    return {field: case((quality.is_(None), current[field]), else_=next_values[field]) for field in SCHEDULE_FIELDS}
+
+# quality 없이 숙련도만 바뀌면 그 변화를 복습 한 번으로 본다 (총합이 오르면 4, 내리면 1, 그대로면 일정 유지)
+SKILL_UP_QUALITY, SKILL_DOWN_QUALITY = 4, 1
+
+def review_quality(quality, new_total, old_total):
+    """보낸 quality, 없으면 숙련도 총합 변화로 정한 quality (SQL 식)"""
+    return func.coalesce(quality, case(
+        (new_total > old_total, SKILL_UP_QUALITY),
+        (new_total < old_total, SKILL_DOWN_QUALITY),
+        else_=null(),
+    ))
+
+def merge_skill_upserts(items: List[UserWordSkillUpsertData]) -> List[Dict[str, Any]]:
+    """
+    같은 word_id 가 여러 번 오면 한 행으로 합친다 (ON CONFLICT 는 한 문장에서 같은 행을 두 번 못 바꿈)
+    필드별로 set(절대값, 나중 것 우선) / inc(증가량, 누적) 으로 정리
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        row = merged.get(item.word_id)
+        if row is None:
+            row = {"word_id": item.word_id, "is_favorite": None, "quality": None}
+            for field in SKILL_FIELDS:
+                row[f"{field}_set"], row[f"{field}_inc"] = None, 0
+            merged[item.word_id] = row
+        for field in SKILL_FIELDS:
+            value = getattr(item, field)
+            if value is None:
+                continue
+            if item.increment:
+                row[f"{field}_inc"] += value
+            else:
+                row[f"{field}_set"], row[f"{field}_inc"] = value, 0
+        if item.is_favorite is not None:
+            row["is_favorite"] = item.is_favorite
+        if item.quality is not None:
+            row["quality"] = item.quality  # 같은 단어를 여러 번 복습했으면 마지막 응답 기준
+    return list(merged.values())
+
+def upsert_user_word_skills_stmt(rows: List[Dict[str, Any]], user_id: str):
+    """
+    INSERT ... SELECT FROM (VALUES ...) ON CONFLICT (user_id, word_id) DO UPDATE 한 문장
+    - 새 행: clamp(coalesce(set, 0) + inc)
+    - 기존 행: clamp(coalesce(set, 현재값) + inc), 보내지 않은 필드는 그대로
+    - 복습 일정(SM-2)도 같은 문장에서 갱신 (새 행은 기본 일정에서 계산)
+      quality 가 없으면 숙련도 총합 변화로 정한다 (review_quality) - 바뀐 게 없으면 일정은 그대로
+    증가량은 EXCLUDED 로 전달할 수 없어서 (새 행 값은 0~100 으로 잘리므로) 입력 VALUES 를 word_id 로 다시 참조한다.
+    """
+    columns = [column("word_id", UUID(as_uuid=False))]
+    for field in SKILL_FIELDS:
+        columns += [column(f"{field}_set", Integer), column(f"{field}_inc", Integer)]
+    columns += [column("is_favorite", Boolean), column("quality", Integer)]
+    data = [tuple(row[c.name] for c in columns) for row in rows]
+    raw = values(*columns, name="v_raw").data(data)
+    # 모두 NULL 인 열은 타입이 text 로 추론되므로 명시적으로 캐스트
+    v = select(*[cast(raw.c[c.name], c.type).label(c.name) for c in columns]).cte("v")
+
+    table = UserWordSkill.__table__
+    new_skills = {field: _clamp_skill(func.coalesce(v.c[f"{field}_set"], 0) + v.c[f"{field}_inc"]) for field in SKILL_FIELDS}
+    new_schedule = sm2_schedule(review_quality(v.c.quality, sum(new_skills.values()), 0), SM2_INITIAL)
+    ins = pg_insert(UserWordSkill).from_select(
+        ["id", "user_id", "word_id", *SKILL_FIELDS, "is_favorite", *SCHEDULE_FIELDS],
+        select(
+            func.gen_random_uuid(),
+            literal(user_id, UUID(as_uuid=False)),
+            v.c.word_id,
+            *[new_skills[field] for field in SKILL_FIELDS],
+            func.coalesce(v.c.is_favorite, False),
+            *[new_schedule[field] for field in SCHEDULE_FIELDS],
+        ),
+    )
+    # ON CONFLICT SET 의 서브쿼리는 바깥(기존 행, EXCLUDED)과 자동 correlate 되지 않으므로 이름으로 참조
+    excluded_word_id = literal_column("excluded.word_id")
+
+    def current(field: str):
+        return literal_column(f"{table.name}.{field}")
+
+    def from_input(expr):
+        return select(expr).where(v.c.word_id == excluded_word_id).scalar_subquery()
+
+    skills = {field: _clamp_skill(func.coalesce(v.c[f"{field}_set"], current(field)) + v.c[f"{field}_inc"]) for field in SKILL_FIELDS}
+    set_ = {field: from_input(skills[field]) for field in SKILL_FIELDS}
+    set_["is_favorite"] = from_input(func.coalesce(v.c.is_favorite, current("is_favorite")))
+    quality = review_quality(v.c.quality, sum(skills.values()), current("total_skill"))
+    schedule = sm2_schedule(quality, {field: current(field) for field in SCHEDULE_FIELDS})
+    set_.update({field: from_input(schedule[field]) for field in SCHEDULE_FIELDS})
+    set_["updated_at"] = func.now()
+    return ins.on_conflict_do_update(index_elements=[UserWordSkill.user_id, UserWordSkill.word_id], set_=set_).returning(
+        UserWordSkill.id, UserWordSkill.word_id, *[table.c[field] for field in SKILL_FIELDS], UserWordSkill.is_favorite,
+        *[table.c[field] for field in SCHEDULE_FIELDS],
+        literal_column("(xmax = 0)").label("created"),
+    )
+
+def upsert_user_word_skill_batch(user_word_skill_data: List[UserWordSkillUpsertData], db: Session=None, user_id:str = None) -> Dict[str, Dict[str, Any]]:
+    """
+    퀴즈 결과 등 숙련도를 한 번의 왕복으로 기록합니다. (없으면 생성, 있으면 보낸 필드만 변경/증가)
+    Args:
+        user_word_skill_data: [UserWordSkillUpsertData]
+    Returns:
+        { word_id: {id, skill_*, is_favorite, due_at, interval_days, ease, repetitions, last_reviewed_at, created} }
+    """
+    if not user_word_skill_data:
+        return {}
+    rows = merge_skill_upserts(user_word_skill_data)
+    result = {}
+    for row in db.execute(upsert_user_word_skills_stmt(rows, user_id)).mappings():
+        row = dict(row)
+        result[row.pop("word_id")] = row
+    db.commit()
+    return result
+
 def delete_user_word_skill_batch(user_word_skill_ids: List[int], db: Session=None, user_id:str = None):
     """
     여러 단어 숙련도를 ID로 일괄 삭제합니다.
@@ -105,6 +266,42 @@ def delete_user_word_skill_batch(user_word_skill_ids: List[int], db: Session=Non
 
 
 
+def _user_word_skill_to_row(user_word_skill) -> Dict[str, Any]:
+    return {
+        "id": user_word_skill.id,
+        "word_id": user_word_skill.word_id,
+        "word_info": user_word_skill.word.word,
+        "skill_kanji": user_word_skill.skill_kanji,
+        "skill_word_reading": user_word_skill.skill_word_reading,
+        "skill_word_speaking": user_word_skill.skill_word_speaking,
+        "skill_sentence_reading": user_word_skill.skill_sentence_reading,
+        "skill_sentence_speaking": user_word_skill.skill_sentence_speaking,
+        "skill_sentence_listening": user_word_skill.skill_sentence_listening,
+        "is_favorite": user_word_skill.is_favorite,
+    }
+
+def _due_user_word_skills_stmt(limit: int, user_id: str):
+    # (user_id, due_at) 인덱스 범위 스캔 - 전체 단어 수와 무관하게 limit 개만 읽는다
+    return (
+        select(UserWordSkill).options(*load_profile(UserWordSkill, "list"))
+        .where(UserWordSkill.user_id == user_id, UserWordSkill.due_at <= func.now())
+        .order_by(UserWordSkill.due_at)
+        .limit(limit)
+    )
+
+def _user_word_skills_by_word_ids_stmt(word_ids: List[int], user_id: str):
+    return select(UserWordSkill).options(*load_profile(UserWordSkill, "list")).where(UserWordSkill.user_id == user_id, UserWordSkill.word_id.in_(word_ids))
+
+def _all_user_word_skills_stmts(limit: Optional[int], offset: Optional[int], user_id: str):
+    count_stmt = select(func.count()).select_from(UserWordSkill).where(UserWordSkill.user_id == user_id)
+    stmt = select(UserWordSkill).options(*load_profile(UserWordSkill, "list")).where(UserWordSkill.user_id == user_id)
+    if offset:
+        stmt = stmt.offset(offset)
+    if limit:
+        stmt = stmt.limit(limit)
+    return count_stmt, stmt
+
+
 def get_user_word_skills_by_word_ids(word_ids: List[int], db: Session=None, user_id:str = None) -> List[Dict[str, Any]]:
     """
     특정 단어 ID에 해당하는 모든 단어 숙련도를 조회합니다.
@@ -118,24 +315,8 @@ def get_user_word_skills_by_word_ids(word_ids: List[int], db: Session=None, user
     if db is None:
         db = SessionLocal()
     try:
-        user_word_skills = db.query(UserWordSkill).filter(UserWordSkill.user_id == user_id).filter(UserWordSkill.word_id.in_(word_ids)).all()
-        
-        result = []
-        for user_word_skill in user_word_skills:
-            result.append({
-                "id": user_word_skill.id,
-                "word_id": user_word_skill.word_id,
-                "word_info": user_word_skill.word.word,
-                "skill_kanji": user_word_skill.skill_kanji,
-                "skill_word_reading": user_word_skill.skill_word_reading,
-                "skill_word_speaking": user_word_skill.skill_word_speaking,
-                "skill_sentence_reading": user_word_skill.skill_sentence_reading,
-                "skill_sentence_speaking": user_word_skill.skill_sentence_speaking,
-                "skill_sentence_listening": user_word_skill.skill_sentence_listening,
-                "is_favorite": user_word_skill.is_favorite,
-            })
-        
-        return result
+        user_word_skills = db.execute(_user_word_skills_by_word_ids_stmt(word_ids, user_id)).scalars().all()
+        return [_user_word_skill_to_row(user_word_skill) for user_word_skill in user_word_skills]
         
     finally:
         db.close()
@@ -155,34 +336,12 @@ def get_all_user_word_skills(limit: Optional[int] = None, offset: Optional[int]
     if db is None:
         db = SessionLocal()
     try:
-        # 전체 예문 수 조회
-        total_count = db.query(UserWordSkill).filter(UserWordSkill.user_id == user_id).count()
-
-        query = db.query(UserWordSkill).filter(UserWordSkill.user_id == user_id)
-        if offset:
-            query = query.offset(offset)
-        if limit:
-            query = query.limit(limit)
-        user_word_skills = query.all()
-    
-        result_user_word_skills = []
-        for user_word_skill in user_word_skills:
-            result_user_word_skills.append({
-                "id": user_word_skill.id,
-                "word_id": user_word_skill.word_id,
-                "word_info": user_word_skill.word.word,
-                "skill_kanji": user_word_skill.skill_kanji,
-                "skill_word_reading": user_word_skill.skill_word_reading,
-                "skill_word_speaking": user_word_skill.skill_word_speaking,
-                "skill_sentence_reading": user_word_skill.skill_sentence_reading,
-                "skill_sentence_speaking": user_word_skill.skill_sentence_speaking,
-                "skill_sentence_listening": user_word_skill.skill_sentence_listening,
-                "is_favorite": user_word_skill.is_favorite,
-            })
-        
+        count_stmt, stmt = _all_user_word_skills_stmts(limit, offset, user_id)
+        total_count = db.execute(count_stmt).scalar_one()
+        user_word_skills = db.execute(stmt).scalars().all()
         return {
             "total_count": total_count,
-            "user_word_skills": result_user_word_skills,
+            "user_word_skills": [_user_word_skill_to_row(user_word_skill) for user_word_skill in user_word_skills],
             "limit": limit,
             "offset": offset
         }
@@ -191,3 +350,43 @@ def get_all_user_word_skills(limit: Optional[int] = None, offset: Optional[int]
         db.close()
 
 
+def get_due_user_word_skills(limit: int, db: Session=None, user_id:str = None) -> List[Dict[str, Any]]:
+    """
+    지금 복습할 단어 숙련도를 복습 예정 시각이 오래된 순으로 조회합니다. (SM-2 일정)
+    Args:
+        limit: 가져올 수
+    Returns:
+        단어 숙련도 + 복습 일정 리스트
+    """
+    if limit <= 0:
+        return []
+    user_word_skills = db.execute(_due_user_word_skills_stmt(limit, user_id)).scalars().all()
+    return [
+        {
+            **_user_word_skill_to_row(user_word_skill),
+            **{field: getattr(user_word_skill, field) for field in SCHEDULE_FIELDS},
+        }
+        for user_word_skill in user_word_skills
+    ]
+
+
+# ---------------------------------------------------------------------
+# AsyncSession 버전 (조회 전용)
+# ---------------------------------------------------------------------
+async def get_user_word_skills_by_word_ids_async(word_ids: List[int], db: AsyncSession=None, user_id:str = None) -> List[Dict[str, Any]]:
+    """get_user_word_skills_by_word_ids 의 AsyncSession 버전."""
+    user_word_skills = (await db.execute(_user_word_skills_by_word_ids_stmt(word_ids, user_id))).scalars().all()
+    return [_user_word_skill_to_row(user_word_skill) for user_word_skill in user_word_skills]
+
+
+async def get_all_user_word_skills_async(limit: Optional[int] = None, offset: Optional[int] = None, db: AsyncSession=None, user_id:str = None) -> Dict[str, Any]:
+    """get_all_user_word_skills 의 AsyncSession 버전."""
+    count_stmt, stmt = _all_user_word_skills_stmts(limit, offset, user_id)
+    total_count = (await db.execute(count_stmt)).scalar_one()
+    user_word_skills = (await db.execute(stmt)).scalars().all()
+    return {
+        "total_count": total_count,
+        "user_word_skills": [_user_word_skill_to_row(user_word_skill) for user_word_skill in user_word_skills],
+        "limit": limit,
+        "offset": offset
+    }
@@ -0,0 +1,123 @@
+# word_cards.py
+from typing import List, Dict, Any, Iterable, Tuple
+from sqlalchemy import select, func, exists
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from db import SessionLocal, Word, WordCard, User
+from service.word_chain import word_chain_ids_stmt, resolve_word_chains
+
+# 학습 카드 문서 (word_cards.card, JSONB)
+#   {id, word, jp_pronunciation, kr_pronunciation, kr_meaning, level, user_id, user_display_name, root_word_id,
+#    examples: [{id, word_id, tags, jp_text, kr_meaning, depth}], images: [{id, word_id, tags, object_key, depth}]}
+# 예문/이미지는 root_word 사슬 전체 것 (depth 0 = 자기 것). 이미지는 object_key 만 두고 presign 은 읽는 쪽에서.
+#
+# 단어/예문/이미지를 바꾸는 쪽은 commit 전에 같은 세션으로 refresh_word_cards(바뀐 단어 id) 를 부른다.
+# 바뀐 단어를 사슬에 포함하는 분기 단어들의 카드도 chain_ids (GIN 인덱스) 로 찾아 함께 다시 만든다.
+# 읽는 쪽은 get_word_cards 로 id 조회 한 번 (카드가 아직 없으면 그 자리에서 만들어 돌려줌).
+
+
+def _word_rows_stmt(word_ids: Iterable[str]):
+    return (
+        select(Word.id, Word.word, Word.jp_pronunciation, Word.kr_pronunciation, Word.kr_meaning, Word.level,
+               Word.user_id, User.display_name.label("user_display_name"), Word.root_word_id)
+        .outerjoin(User, User.id == Word.user_id)
+        .where(Word.id.in_(list(word_ids)))
+    )
+
+def build_word_cards(word_ids: Iterable[str], db: Session) -> Dict[str, Tuple[Dict[str, Any], List[str]]]:
+    """{word_id: (card, chain_ids)} - 없는(삭제된) 단어는 빠진다."""
+    word_ids = {str(wid) for wid in word_ids if wid}
+    if not word_ids:
+        return {}
+    words = db.execute(_word_rows_stmt(word_ids)).mappings().all()
+    chain_ids = dict(db.execute(word_chain_ids_stmt(word_ids)).all())
+    chains = resolve_word_chains(word_ids, db)
+    cards = {}
+    for word in words:
+        chain = chains.get(word["id"], {})
+        card = {
+            **word,
+            "examples": chain.get("examples", []),
+            "images": chain.get("images", []),
+        }
+        cards[word["id"]] = (card, chain_ids.get(word["id"], [word["id"]]))
+    return cards
+
+def refresh_word_cards(word_ids: Iterable[str], db: Session) -> int:
+    """
+    바뀐 단어들과 그 단어를 사슬에 포함하는 분기 단어들의 카드를 다시 만든다 (commit 은 호출 측에서).
+    삭제된 단어의 카드는 FK(ON DELETE CASCADE)로 지워지고, 그 단어를 물려받던 분기 카드는 여기서 갱신된다.
+    단어 행을 잠근 뒤에 만들므로 동시에 같은 단어를 바꾼 두 트랜잭션이 서로의 변경을 덮어쓰지 않는다.
+    """
+    word_ids = {str(wid) for wid in word_ids if wid}
+    if not word_ids:
+        return 0
+    db.flush()
+    branch_ids = db.execute(
+        select(WordCard.word_id).where(WordCard.chain_ids.overlap(list(word_ids)))
+    ).scalars().all()
+    affected = word_ids | set(branch_ids)
+    # 같은 단어의 카드를 동시에 다시 만드는 트랜잭션끼리 순서를 세운다 (나중 쪽이 먼저 커밋된 변경까지 보고 만들도록).
+    # FOR NO KEY UPDATE: 예문/이미지 INSERT 의 FK 검사(KEY SHARE)와는 충돌하지 않음. id 순으로 잡아 교착 방지.
+    db.execute(
+        select(Word.id).where(Word.id.in_(list(affected)))
+        .order_by(Word.id).with_for_update(key_share=True)
+    ).all()
+    cards = build_word_cards(affected, db)
+    if not cards:
+        return 0
+    stmt = pg_insert(WordCard).values([
+        {"word_id": word_id, "card": card, "chain_ids": chain_ids}
+        for word_id, (card, chain_ids) in cards.items()
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[WordCard.word_id],
+        set_={"card": stmt.excluded.card, "chain_ids": stmt.excluded.chain_ids, "updated_at": func.now()},
+    ))
+    return len(cards)
+
+def build_missing_word_cards(batch_size: int = 1000) -> int:
+    """카드가 없는 단어(기존 데이터, 카드 도입 이전)에 카드를 만든다. 서버 시작 시 호출."""
+    total = 0
+    while True:
+        with SessionLocal() as db:
+            word_ids = db.execute(
+                select(Word.id).where(~exists().where(WordCard.word_id == Word.id)).limit(batch_size)
+            ).scalars().all()
+            if not word_ids:
+                break
+            refresh_word_cards(word_ids, db)
+            db.commit()
+        total += len(word_ids)
+    if total:
+        print(f"word_cards: built {total} missing cards")
+    return total
+
+
+def _cards_stmt(word_ids: Iterable[str]):
+    return select(WordCard.word_id, WordCard.card).where(WordCard.word_id.in_(list(word_ids)))
+
+def get_word_cards(word_ids: Iterable[str], db: Session) -> Dict[str, Dict[str, Any]]:
+    """{word_id: card} - word_cards 기본 키 조회 한 번"""
+    word_ids = {str(wid) for wid in word_ids if wid}
+    if not word_ids:
+        return {}
+    cards = dict(db.execute(_cards_stmt(word_ids)).all())
+    missing = word_ids - cards.keys()
+    if missing:
+        cards.update({word_id: card for word_id, (card, _) in build_word_cards(missing, db).items()})
+    return cards
+
+async def get_word_cards_async(word_ids: Iterable[str], db: AsyncSession) -> Dict[str, Dict[str, Any]]:
+    """get_word_cards 의 AsyncSession 버전."""
+    word_ids = {str(wid) for wid in word_ids if wid}
+    if not word_ids:
+        return {}
+    cards = dict((await db.execute(_cards_stmt(word_ids))).all())
+    missing = word_ids - cards.keys()
+    if missing:
+        built = await db.run_sync(lambda session: build_word_cards(missing, session))
+        cards.update({word_id: card for word_id, (card, _) in built.items()})
+    return cards
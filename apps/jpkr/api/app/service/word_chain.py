@@ -0,0 +1,110 @@
+# word_chain.py
+from collections import defaultdict
+from typing import List, Dict, Any, Iterable
+from sqlalchemy import select, func, literal, cast, null, union_all, Text
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, array, aggregate_order_by
+
+from db import Word, Example, WordImage
+
+# 분기 단어(root_word_id 로 다른 사람 단어를 가리키는 개인 사본)는 조상 단어들의 예문/이미지도 함께 보여준다.
+# 재귀 CTE 로 단어 → 루트까지의 사슬을 따라가고, 사슬 전체의 예문/이미지를 한 문장(한 번의 왕복)으로 가져온다.
+#
+#   chains = resolve_word_chains(word_ids, db)
+#   chains[word_id]["examples"]  # 자기 것(depth 0) → 부모(depth 1) → ... 순
+#   chains[word_id]["images"]    # object_key 포함 (presign 은 호출 측에서)
+
+
+def word_chain_cte(word_ids: Iterable[str]):
+    """(word_id, ancestor_id, depth) - 자기 자신(depth 0)부터 루트까지. 순환이 있어도 같은 단어는 한 번만."""
+    uuid_type = UUID(as_uuid=False)
+    base = select(
+        Word.id.label("word_id"),
+        Word.id.label("ancestor_id"),
+        Word.root_word_id.label("next_id"),
+        literal(0).label("depth"),
+        array([Word.id], type_=uuid_type).label("path"),
+    ).where(Word.id.in_(list(word_ids)))
+    chain = base.cte("word_chain", recursive=True)
+    parent = aliased(Word)
+    return chain.union_all(
+        select(
+            chain.c.word_id,
+            parent.id,
+            parent.root_word_id,
+            chain.c.depth + 1,
+            func.array_append(chain.c.path, parent.id, type_=ARRAY(uuid_type)),
+        ).where(parent.id == chain.c.next_id, parent.id != func.all(chain.c.path))
+    )
+
+
+def word_chain_ids_stmt(word_ids: Iterable[str]):
+    """(word_id, chain_ids) - 자기 자신부터 루트까지의 단어 id 배열"""
+    chain = word_chain_cte(word_ids)
+    return (
+        select(chain.c.word_id, func.array_agg(aggregate_order_by(chain.c.ancestor_id, chain.c.depth)).label("chain_ids"))
+        .group_by(chain.c.word_id)
+    )
+
+
+def word_chain_items_stmt(word_ids: Iterable[str]):
+    chain = word_chain_cte(word_ids)
+    examples = (
+        select(
+            chain.c.word_id, chain.c.depth, literal("example").label("kind"),
+            Example.id, Example.word_id.label("source_word_id"), Example.tags,
+            Example.jp_text, Example.kr_meaning, cast(null(), Text).label("object_key"), Example.created_at,
+        )
+        .join(Example, Example.word_id == chain.c.ancestor_id)
+    )
+    images = (
+        select(
+            chain.c.word_id, chain.c.depth, literal("image").label("kind"),
+            WordImage.id, WordImage.word_id.label("source_word_id"), WordImage.tags,
+            cast(null(), Text), cast(null(), Text), WordImage.object_key, WordImage.created_at,
+        )
+        .join(WordImage, WordImage.word_id == chain.c.ancestor_id)
+    )
+    items = union_all(examples, images).subquery("chain_items")
+    return select(items).order_by(items.c.word_id, items.c.depth, items.c.created_at, items.c.id)
+
+
+def group_word_chains(rows) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    chains = defaultdict(lambda: {"examples": [], "images": []})
+    for row in rows:
+        item = chains[row.word_id]
+        if row.kind == "example":
+            item["examples"].append({
+                "id": row.id,
+                "word_id": row.source_word_id,
+                "tags": row.tags,
+                "jp_text": row.jp_text,
+                "kr_meaning": row.kr_meaning,
+                "depth": row.depth,
+            })
+        else:
+            item["images"].append({
+                "id": row.id,
+                "word_id": row.source_word_id,
+                "tags": row.tags,
+                "object_key": row.object_key,
+                "depth": row.depth,
+            })
+    return dict(chains)
+
+
+def resolve_word_chains(word_ids: Iterable[str], db: Session) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    """{word_id: {"examples": [...], "images": [...]}} - 예문/이미지가 하나도 없는 단어는 빠진다."""
+    word_ids = {str(wid) for wid in word_ids if wid}
+    if not word_ids:
+        return {}
+    return group_word_chains(db.execute(word_chain_items_stmt(word_ids)).all())
+
+
+async def resolve_word_chains_async(word_ids: Iterable[str], db: AsyncSession) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    """resolve_word_chains 의 AsyncSession 버전."""
+    word_ids = {str(wid) for wid in word_ids if wid}
+    if not word_ids:
+        return {}
+    return group_word_chains((await db.execute(word_chain_items_stmt(word_ids))).all())
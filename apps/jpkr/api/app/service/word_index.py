@@ -0,0 +1,175 @@
+# word_index.py
+import time
+import threading
+from datetime import datetime
+from collections import defaultdict
+from typing import NamedTuple, Optional, List, Dict, Iterable
+from sqlalchemy import select
+
+from settings import settings
+from db import SessionLocal, Word, User
+
+# 텍스트 분석용 단어 사전 인덱스 (프로세스 메모리) - 단어 컬럼만 (예문/이미지는 word_cards 에서)
+# 서버 시작 시 한 번 로드하고, 단어가 바뀌면 해당 단어만 다시 읽는다.
+# (uvicorn 워커가 여러 개면 다른 워커의 변경은 WORD_INDEX_TTL_SECONDS 주기의 전체 재로딩으로 반영,
+#  재로딩은 백그라운드 스레드에서 하고 그동안 요청은 이전 인덱스로 처리)
+# 같은 lemma/reading 의 단어 목록은 (created_at, id) 순 - 먼저 등록된 단어가 앞 (analysis_text._resolve_word)
+
+class WordEntry(NamedTuple):
+    id: str
+    user_id: Optional[str]
+    root_word_id: Optional[str]
+    word: str
+    jp_pronunciation: str
+    kr_pronunciation: str
+    kr_meaning: str
+    level: str
+    user_display_name: Optional[str]
+    created_at: datetime
+
+def _load_rows(db, word_ids: Optional[List[str]] = None):
+    words_stmt = (
+        select(Word.id, Word.user_id, Word.root_word_id, Word.word, Word.jp_pronunciation,
+               Word.kr_pronunciation, Word.kr_meaning, Word.level, User.display_name, Word.created_at)
+        .outerjoin(User, User.id == Word.user_id)
+        .order_by(Word.created_at, Word.id)
+    )
+    if word_ids is not None:
+        words_stmt = words_stmt.where(Word.id.in_(word_ids))
+    return [WordEntry(*row) for row in db.execute(words_stmt).all()]
+
+
+class WordIndex:
+    def __init__(self, ttl_seconds: int = 0):
+        self.ttl_seconds = max(0, int(ttl_seconds))
+        self._lock = threading.RLock()
+        self._reloading = threading.Lock()
+        self._words: Dict[str, WordEntry] = {}
+        self._by_lemma: Dict[str, List[str]] = {}
+        self._by_reading: Dict[str, List[str]] = {}
+        self._loaded_at: Optional[float] = None
+        self._refreshed_during_load: set = set()
+        # metrics
+        self._loads = 0
+        self._refreshes = 0
+        self._load_ms = 0.0
+
+    # ---------- 로딩 ----------
+    def load(self):
+        """전체 재로딩. 새 맵을 만든 뒤 한 번에 교체하므로 로딩 중에도 기존 인덱스로 조회된다."""
+        if not self._reloading.acquire(blocking=False):
+            return  # 다른 스레드가 이미 로딩 중
+        try:
+            started = time.perf_counter()
+            db = SessionLocal()
+            try:
+                words = _load_rows(db)
+            finally:
+                db.close()
+            new_words, new_by_lemma, new_by_reading = {}, defaultdict(list), defaultdict(list)
+            for w in words:
+                new_words[w.id] = w
+                if w.word:
+                    new_by_lemma[w.word].append(w.id)
+                if w.jp_pronunciation:
+                    new_by_reading[w.jp_pronunciation].append(w.id)
+            with self._lock:
+                self._words = new_words
+                self._by_lemma = dict(new_by_lemma)
+                self._by_reading = dict(new_by_reading)
+                self._loaded_at = time.monotonic()
+                self._loads += 1
+                self._load_ms = round((time.perf_counter() - started) * 1000, 3)
+                missed = self._refreshed_during_load
+                self._refreshed_during_load = set()
+        finally:
+            self._reloading.release()
+        # 전체 로딩 도중 들어온 변경은 이전 맵에 반영됐으므로 새 맵에 다시 반영
+        if missed:
+            self.refresh(missed)
+
+    def ensure_fresh(self):
+        if self._loaded_at is None:
+            self.load()
+        elif self.ttl_seconds and time.monotonic() - self._loaded_at > self.ttl_seconds:
+            # 요청 스레드를 막지 않도록 백그라운드에서 (이미 로딩 중이면 생략)
+            if not self._reloading.locked():
+                threading.Thread(target=self._load_quietly, name="word-index-reload", daemon=True).start()
+
+    def _load_quietly(self):
+        try:
+            self.load()
+        except Exception as e:
+            print("word_index reload failed:", e)
+
+    def refresh(self, word_ids: Iterable[str]):
+        """바뀐 단어만 DB 에서 다시 읽어 교체 (삭제된 단어는 제거)."""
+        word_ids = list({str(wid) for wid in word_ids if wid})
+        if not word_ids or self._loaded_at is None:
+            return
+        db = SessionLocal()
+        try:
+            words = _load_rows(db, word_ids)
+        finally:
+            db.close()
+        with self._lock:
+            if self._reloading.locked():
+                self._refreshed_during_load.update(word_ids)
+            for wid in word_ids:
+                self._remove(wid)
+            for w in words:
+                self._words[w.id] = w
+                if w.word:
+                    self._insert_ordered(self._by_lemma.setdefault(w.word, []), w.id)
+                if w.jp_pronunciation:
+                    self._insert_ordered(self._by_reading.setdefault(w.jp_pronunciation, []), w.id)
+            self._refreshes += 1
+
+    def _insert_ordered(self, ids: List[str], word_id: str):
+        # 전체 로딩과 같은 (created_at, id) 순서 유지
+        ids.append(word_id)
+        ids.sort(key=lambda i: (self._words[i].created_at, i))
+
+    def _remove(self, word_id: str):
+        old = self._words.pop(word_id, None)
+        if old is None:
+            return
+        for index, key in ((self._by_lemma, old.word), (self._by_reading, old.jp_pronunciation)):
+            ids = index.get(key)
+            if ids and word_id in ids:
+                ids.remove(word_id)
+                if not ids:
+                    del index[key]
+
+    # ---------- 조회 ----------
+    def _entries(self, ids: Optional[List[str]]):
+        if not ids:
+            return None
+        with self._lock:
+            return [self._words[i] for i in ids if i in self._words]
+
+    def by_lemma(self, lemma: str):
+        """[WordEntry, ...] 등록 순서대로"""
+        with self._lock:
+            ids = list(self._by_lemma.get(lemma, ()))
+        return self._entries(ids)
+
+    def by_reading(self, reading: str):
+        with self._lock:
+            ids = list(self._by_reading.get(reading, ()))
+        return self._entries(ids)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "words": len(self._words),
+                "lemmas": len(self._by_lemma),
+                "readings": len(self._by_reading),
+                "loads": self._loads,
+                "refreshes": self._refreshes,
+                "last_load_ms": self._load_ms,
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+            }
+
+
+word_index = WordIndex(settings.WORD_INDEX_TTL_SECONDS)
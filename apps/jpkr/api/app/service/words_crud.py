@@ -1,11 +1,16 @@
 # words_crud.py
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, select, update, delete, func, case
 from typing import List, Dict, Any, Optional, Sequence
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from models import WordData
-from db import SessionLocal, Word
+from db import SessionLocal, Word, Example, schema_features, load_profile
+from service.word_index import word_index
+from service.word_cards import refresh_word_cards
+from utils.cursor import encode_cursor, decode_cursor
+from utils.paging import keyset_after, next_keyset_cursor, get_total_count, get_total_count_async
 from datetime import datetime
 
 
@@ -18,7 +23,7 @@ def create_words_batch(words_data: List[WordData], db: Session, user_id: Optiona
         return {}
     # 유저별 유니크라면 (user_id, word) 키가 실질 키
     word_keys = list({(user_id, wd.word) for wd in words_data if wd.word is not None})
-    stmt_exist = select(Word).where(
+    stmt_exist = select(Word).options(*load_profile(Word, "list")).where(
         (Word.user_id == user_id) & (Word.word.in_([w for _, w in word_keys]))
     )
     existing_rows = db.execute(stmt_exist).scalars().all()
@@ -31,41 +36,68 @@ def create_words_batch(words_data: List[WordData], db: Session, user_id: Optiona
         key = wd.word if user_id is None else (user_id, wd.word)
         if key in existing_map:
             continue
+        existing_map[key] = None  # 같은 요청 안의 중복도 한 번만 insert
         payload = {k: v for k, v in wd.model_dump().items() if v is not None}
         if user_id is not None:
             payload['user_id'] = user_id
         rows_to_insert.append(payload)
     result_map: Dict[str, dict] = {}
     # 4) 중복은 유지(또는 업데이트), 신규만 일괄 insert
+    inserted_ids = []
     if rows_to_insert:
-        ins = pg_insert(Word).values(rows_to_insert)
-        db.execute(ins)
+        ins = pg_insert(Word).values(rows_to_insert).returning(Word.id)
+        inserted_ids = db.execute(ins).scalars().all()
     # 5) 결과 구성: 기존 + (옵션) 신규
     for w in existing_rows:
         result_map[w.word] = row_to_dict(w)
+    refresh_word_cards(inserted_ids, db)
     db.commit()
+    word_index.refresh(inserted_ids)
     return result_map
 
 
+_WORD_UPDATE_FIELDS = ("word", "jp_pronunciation", "kr_pronunciation", "kr_meaning", "level")
+# level_rank 는 level 에서 DB 가 계산하는 값이라 수정 결과에는 넣지 않는다 (바뀐 level 과 어긋남)
+_WORD_RESULT_COLUMNS = [c for c in Word.__table__.columns if c.name != "level_rank"]
+
 def update_words_batch(words_data: List[Dict[str, Any]], db: Session=None, user_id:str = None) -> Dict[int, Dict[str, Any]]:
-    result = {}        
+    # 대상 행을 한 번에 읽고, 변경은 id 기준 executemany UPDATE 한 번으로
+    if not words_data:
+        return {}
+    ids = {word_data.id for word_data in words_data if word_data.id is not None}
+    current = {
+        row["id"]: dict(row)
+        for row in db.execute(select(*_WORD_RESULT_COLUMNS).where(Word.id.in_(ids))).mappings()
+    }
+    # 바꾸려는 이름을 이미 쓰고 있는 단어 ((user_id, word) unique) - 같은 요청 안에서 이름을 맞바꾸는 것도 충돌로 본다
+    holders = {}
+    if user_id is not None and current:
+        names = {word_data.word for word_data in words_data if word_data.id in current}
+        holders = dict(db.execute(select(Word.word, Word.id).where(Word.user_id == user_id, Word.word.in_(names))).all())
+    result = {}
+    params = {}
     for word_data in words_data:
-        word = db.query(Word).filter(Word.id == word_data.id).first()
-        
-        if word:
-            # 단어 데이터 업데이트
-            word.word = word_data.word
-            word.jp_pronunciation = word_data.jp_pronunciation
-            word.kr_pronunciation = word_data.kr_pronunciation
-            word.kr_meaning = word_data.kr_meaning
-            word.level = word_data.level
-            word.user_id = user_id
-            
-            result[word_data.id] = row_to_dict(word)            
-        else:
+        row = current.get(word_data.id)
+        if row is None:
             # 해당 ID의 단어가 없는 경우
-            result[word_data.id] = {"error": "Word not found"}    
+            result[word_data.id] = {"error": "Word not found"}
+            continue
+        if holders.setdefault(word_data.word, word_data.id) != word_data.id:
+            # 같은 사용자에게 같은 단어가 이미 있는 경우
+            result[word_data.id] = {"error": "Word already exists"}
+            params.pop(word_data.id, None)
+            continue
+        # 단어 데이터 업데이트 (같은 id 가 여러 번 오면 마지막 값)
+        values = {field: getattr(word_data, field) for field in _WORD_UPDATE_FIELDS}
+        values["user_id"] = user_id
+        row.update(values)
+        result[word_data.id] = row
+        params[word_data.id] = {"id": word_data.id, **values}
+    if params:
+        db.execute(update(Word), list(params.values()))
+    refresh_word_cards(params.keys(), db)
     db.commit()
+    word_index.refresh(params.keys())
     return result
         
 
@@ -79,52 +111,145 @@ def delete_words_batch(word_ids: Sequence[str], db: Session, user_id: str) -> Di
         .returning(Word.id)
     )
     deleted_ids = set(db.execute(stmt).scalars().all())
+    refresh_word_cards(deleted_ids, db)  # 삭제된 단어를 물려받던 분기 카드
     db.commit()
+    word_index.refresh(deleted_ids)
     return {wid: ("deleted" if wid in deleted_ids else "not found") for wid in word_ids}
 
 
-def search_words_by_word(search_term: str, db: Session=None, user_id:str = None) -> List[Dict[str, Any]]:
+def _num_examples_column():
+    # 예문 수를 같은 쿼리에서 계산 (examples.word_id 인덱스 사용)
+    return (
+        select(func.count(Example.id))
+        .where(Example.word_id == Word.id)
+        .correlate(Word)
+        .scalar_subquery()
+        .label("num_examples")
+    )
+
+def _match_score(column, term: str):
+    if schema_features["pg_trgm"]:
+        return func.similarity(column, term)
+    # pg_trgm 이 없는 DB: 일치 > 앞부분 일치 > 포함 순으로만 구분
+    return case((column == term, 1.0), (column.like(f"{term}%"), 0.5), else_=0.1)
+
+def _search_words_stmt(search_term: str, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """
+    "한글,히라가나" 검색어로 단어 검색 (pg_trgm GIN 인덱스 사용)
+    포함 여부로 거르고, 네 컬럼 중 가장 높은 trigram 유사도 순으로 정렬.
+    limit 을 주면 (score, id) keyset 으로 다음 페이지 커서를 만든다.
+    """
     search_terms = search_term.split(',')
-    hangul_pattern = f"%{search_terms[0]}%"
-    hiragana_pattern = f"%{search_terms[1]}%"
-    
-    found_words = db.query(Word).filter(
+    hangul_term = search_terms[0]
+    hiragana_term = search_terms[1] if len(search_terms) > 1 else search_terms[0]
+    hangul_pattern = f"%{hangul_term}%"
+    hiragana_pattern = f"%{hiragana_term}%"
+    score = func.greatest(
+        _match_score(Word.word, hiragana_term),
+        _match_score(Word.jp_pronunciation, hiragana_term),
+        _match_score(Word.kr_pronunciation, hangul_term),
+        _match_score(Word.kr_meaning, hangul_term),
+    )
+    stmt = select(*Word.__table__.columns, _num_examples_column(), score.label("score")).where(
         or_(
             Word.word.like(hiragana_pattern),
             Word.jp_pronunciation.like(hiragana_pattern),
             Word.kr_pronunciation.like(hangul_pattern),
             Word.kr_meaning.like(hangul_pattern),
         )
-    ).all()
-    
-    result = []
-    for word in found_words:
-        word_data = row_to_dict(word)
-        word_data["num_examples"] = str(len(word.examples))
-        result.append(word_data)
+    )
+    if cursor:
+        last_score, last_id = decode_cursor(cursor, 2)
+        stmt = stmt.where(or_(score < last_score, and_(score == last_score, Word.id > last_id)))
+    stmt = stmt.order_by(score.desc(), Word.id)
+    if limit:
+        stmt = stmt.limit(limit + 1)  # 다음 페이지 유무 확인용 1개 더
+    return stmt
+
+def _search_rows_to_result(rows, limit: Optional[int]):
+    words = []
+    for row in rows:
+        word_data = row._asdict()
+        word_data["num_examples"] = str(word_data["num_examples"])
+        words.append(word_data)
+    if not limit:
+        # limit 없이 호출하면 예전처럼 리스트 그대로 (UI words-search 호환)
+        for word_data in words:
+            word_data.pop("score")
+        return words
+    next_cursor = None
+    if len(words) > limit:
+        words = words[:limit]
+        next_cursor = encode_cursor(words[-1]["score"], words[-1]["id"])
+    return {"words": words, "limit": limit, "next_cursor": next_cursor}
+
+def _all_words_stmt(limit: Optional[int], offset: Optional[int], cursor: Optional[str]):
+    """
+    (created_at, id) 순 단어 페이지 + 페이지 단어들의 예문 수 (grouped subquery)
+    cursor 가 None 이면 예전처럼 offset, 문자열이면 ("" = 첫 페이지) keyset
+    """
+    page = select(*Word.__table__.columns).order_by(Word.created_at, Word.id)
+    if cursor is not None:
+        after = keyset_after(Word.created_at, Word.id, cursor)
+        if after is not None:
+            page = page.where(after)
+        if limit:
+            page = page.limit(limit + 1)  # 다음 페이지 유무 확인용 1개 더
+    else:
+        if offset:
+            page = page.offset(offset)
+        if limit:
+            page = page.limit(limit)
+    page = page.subquery()
+    counts = (
+        select(Example.word_id, func.count().label("num_examples"))
+        .where(Example.word_id.in_(select(page.c.id)))
+        .group_by(Example.word_id)
+        .subquery()
+    )
+    return (
+        select(page, func.coalesce(counts.c.num_examples, 0).label("num_examples"))
+        .outerjoin(counts, counts.c.word_id == page.c.id)
+        .order_by(page.c.created_at, page.c.id)
+    )
+
+def _all_words_result(rows, total_count, limit, offset, cursor) -> Dict[str, Any]:
+    words = []
+    for row in rows:
+        word_data = row._asdict()
+        word_data["num_examples"] = str(word_data["num_examples"])
+        words.append(word_data)
+    result = {"total_count": total_count}
+    if cursor is not None:
+        words, next_cursor = next_keyset_cursor(words, limit)
+        result.update({"words": words, "limit": limit, "next_cursor": next_cursor})
+    else:
+        result.update({"words": words, "limit": limit, "offset": offset})
     return result
+
+
+def search_words_by_word(search_term: str, limit: Optional[int] = None, cursor: Optional[str] = None, db: Session=None, user_id:str = None):
+    rows = db.execute(_search_words_stmt(search_term, limit, cursor)).all()
+    return _search_rows_to_result(rows, limit)
         
 
-def get_all_words(limit: Optional[int] = None, offset: Optional[int] = None, db: Session=None, user_id:str = None) -> Dict[str, Any]:
-    total_count = db.query(Word).count()    
+def get_all_words(limit: Optional[int] = None, offset: Optional[int] = None, cursor: Optional[str] = None, total: Optional[str] = None,
+                  db: Session=None, user_id:str = None) -> Dict[str, Any]:
+    # total 기본값: offset 방식은 예전처럼 exact, cursor 방식은 estimated
+    total_count = get_total_count(db, Word, total or ("exact" if cursor is None else "estimated"))
+    rows = db.execute(_all_words_stmt(limit, offset, cursor)).all()
+    return _all_words_result(rows, total_count, limit, offset, cursor)
 
-    # 페이지네이션된 단어 조회
-    query = db.query(Word)    
-    if offset:
-        query = query.offset(offset)
-    if limit:
-        query = query.limit(limit)
-    
-    words = query.all()
-    result_words = []
-    for word in words:
-        word_data = row_to_dict(word)
-        word_data["num_examples"] = str(len(word.examples))
-        result_words.append(word_data)
-    return {
-        "total_count": total_count,
-        "words": result_words,
-        "limit": limit,
-        "offset": offset
-    }
-    
\ No newline at end of file
+# ---------------------------------------------------------------------
+# AsyncSession 버전 (조회 전용)
+# ---------------------------------------------------------------------
+async def search_words_by_word_async(search_term: str, limit: Optional[int] = None, cursor: Optional[str] = None, db: AsyncSession=None, user_id:str = None):
+    rows = (await db.execute(_search_words_stmt(search_term, limit, cursor))).all()
+    return _search_rows_to_result(rows, limit)
+
+
+async def get_all_words_async(limit: Optional[int] = None, offset: Optional[int] = None, cursor: Optional[str] = None, total: Optional[str] = None,
+                              db: AsyncSession=None, user_id:str = None) -> Dict[str, Any]:
+    total_count = await get_total_count_async(db, Word, total or ("exact" if cursor is None else "estimated"))
+    rows = (await db.execute(_all_words_stmt(limit, offset, cursor))).all()
+    return _all_words_result(rows, total_count, limit, offset, cursor)
@@ -1,9 +1,15 @@
-from typing import List, Dict, Any
-from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import select, func, case
+from typing import List, Dict, Any, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, func, exists, literal, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from fastapi import Request
 import uuid
+import asyncio
 from db import Word, UserWordSkill, WordImage
+from service.word_index import word_index
+from service.word_cards import refresh_word_cards, get_word_cards
+from service.user_word_skill import merge_skill_upserts, upsert_user_word_skills_stmt
+from models import UserWordSkillUpsertData
 
 import io, json
 from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
@@ -11,8 +17,129 @@ from settings import settings
 from utils.auth import get_db, get_current_user, CurrentUser
 from utils.aws_s3 import (
     is_allowed_content_type, build_object_key, upload_fileobj,
-    presign_get_url, delete_object
+    presign_get_url, delete_object, run_s3
 )
+from utils.executor import run_sync
+
+def _resolve_targets(texts: List[str], db: Session, user_id: str):
+    """
+    단어 텍스트별로 upsert 대상을 한 번의 조회로 결정
+    - 내 단어가 있으면 → 그 단어를 업데이트
+    - 다른 사람 단어만 있으면 → 그 루트(없으면 가장 먼저 등록된 것)의 내 소유 분기 생성
+    - 없으면 → 내 소유 루트 단어 생성
+    """
+    rows = db.execute(
+        select(Word.id, Word.word, Word.user_id, Word.root_word_id)
+        .where(Word.word.in_(texts))
+        .order_by(Word.created_at, Word.id)
+    ).all()
+    mine: Dict[str, str] = {}
+    base: Dict[str, str] = {}
+    for row in rows:
+        if row.user_id == user_id:
+            mine[row.word] = row.id
+        elif row.word not in base or (row.root_word_id is None and base[row.word][1] is not None):
+            base[row.word] = (row.id, row.root_word_id)
+    return mine, {word: word_id for word, (word_id, _) in base.items()}
+
+def _upsert_words(data: List[Dict[str, Any]], db: Session, user_id: str) -> Dict[str, Any]:
+    # word → payload 매핑
+    words_map = {wrec["word"]: wrec for wrec in data if "word" in wrec}
+    if not words_map:
+        return {"word_id_map": {}, "created_words": [], "updated_words": [], "created_skills": [], "updated_skills": []}
+
+    # ---------- 1) 소유/분기 판단 (조회 1회) ----------
+    mine, base = _resolve_targets(list(words_map.keys()), db, user_id)
+
+    # ---------- 2) 단어 upsert (INSERT ... ON CONFLICT (user_id, word) ... RETURNING 1회) ----------
+    rows = [
+        {
+            "id": mine.get(word) or str(uuid.uuid4()),
+            "user_id": user_id,
+            "root_word_id": None if word in mine else base.get(word),
+            "word": word,
+            "jp_pronunciation": payload.get('jp_pronunciation'),
+            "kr_pronunciation": payload.get('kr_pronunciation'),
+            "kr_meaning": payload.get('kr_meaning'),
+            "level": payload.get('level'),
+        }
+        for word, payload in words_map.items()
+    ]
+    ins = pg_insert(Word).values(rows)
+    ins = ins.on_conflict_do_update(
+        index_elements=[Word.user_id, Word.word],
+        set_={
+            "jp_pronunciation": ins.excluded.jp_pronunciation,
+            "kr_pronunciation": ins.excluded.kr_pronunciation,
+            "kr_meaning": ins.excluded.kr_meaning,
+            "level": ins.excluded.level,
+            "updated_at": func.now(),
+        },
+    ).returning(Word.id, Word.word)
+    word_id_map: Dict[str, str] = {row.word: row.id for row in db.execute(ins).all()}
+    created_words = [word for word in words_map if word not in mine]
+    updated_words = [word for word in words_map if word in mine]
+
+    # ---------- 3) skill 자동처리 (예: level == 'N/A' → 읽기 100), ON CONFLICT upsert 1회 ----------
+    created_skills: List[str] = []
+    updated_skills: List[str] = []
+    skill_words = [word for word, payload in words_map.items() if payload.get('level') in ['N/A']]
+    if skill_words:
+        skill_rows = merge_skill_upserts(
+            UserWordSkillUpsertData(word_id=word_id_map[word], skill_word_reading=100) for word in skill_words
+        )
+        created_by_word_id = {
+            row.word_id: row.created for row in db.execute(upsert_user_word_skills_stmt(skill_rows, user_id)).all()
+        }
+        for word in skill_words:
+            (created_skills if created_by_word_id.get(word_id_map[word]) else updated_skills).append(word)
+
+    return {
+        "word_id_map": word_id_map,
+        "created_words": created_words,
+        "updated_words": updated_words,
+        "created_skills": created_skills,
+        "updated_skills": updated_skills,
+    }
+
+def _replace_images(db: Session, user_id: str, uploaded: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    업로드에 성공한 단어들만 기존 이미지 행을 지우고 새 WordImage 를 넣는다 (같은 savepoint).
+    (생성 결과, 지운 행의 S3 object key) - S3 객체 삭제는 커밋이 끝난 뒤 호출 측에서.
+    """
+    word_ids = list({job["word_id"] for job in uploaded})
+    images = []
+    for job in uploaded:
+        # presigned 보기 URL (사설 버킷 가정)
+        view_url = presign_get_url(job["key"], expires=3600)
+        images.append(WordImage(
+            id=str(uuid.uuid4()),  # 여러 행 INSERT 시 반환 id 매칭을 위해 문자열로 지정
+            user_id=user_id,
+            word_id=job["word_id"],
+            tags=job["tags"],
+            image_url=view_url,
+            object_key=job["key"],
+            content_type=job["content_type"],
+            size_bytes=len(job["raw"]),
+        ))
+    # savepoint: 실패해도 이미지 행만 되돌리고 (기존 이미지 유지) 단어 upsert 는 남긴다
+    with db.begin_nested():
+        existing_images = db.execute(
+            select(WordImage.id, WordImage.object_key)
+            .where(WordImage.user_id == user_id, WordImage.word_id.in_(word_ids))
+        ).all()
+        if existing_images:
+            db.execute(delete(WordImage).where(WordImage.id.in_([row.id for row in existing_images])))
+        db.add_all(images)
+        db.flush()
+    created = [{"index": job["index"], "word": job["word"], "image_id": str(wi.id)} for job, wi in zip(uploaded, images)]
+    return created, [row.object_key for row in existing_images if row.object_key]
+
+def _delete_object_quietly(key: str):
+    try:
+        delete_object(key)
+    except Exception as e:
+        print("S3 delete failed:", e)
 
 async def create_words_personal(
     data_json: str = Form(...),                     # 단어 배열(JSON string)
@@ -35,103 +162,19 @@ async def create_words_personal(
         raise HTTPException(400, detail="file_meta_json length must match files length")
 
     # ---------- 1) 단어 upsert ----------
-    created_words: List[str] = []
-    updated_words: List[str] = []
-    created_skills: List[str] = []
-    updated_skills: List[str] = []
-
-    # word → payload 매핑
-    words_map = {wrec["word"]: wrec for wrec in data if "word" in wrec}
-
-    # 기존 단어 로드
-    stmt = (
-        select(Word)
-        .options(selectinload(Word.examples), selectinload(Word.user_word_skills))
-        .where(Word.word.in_(list(words_map.keys())))
-    )
-    words_existing = db.execute(stmt).scalars().all()
-    words_existing_map = {w.word: w for w in words_existing}
-
-    # upsert 처리
-    word_id_map: Dict[str, str] = {}  # word 텍스트 -> 실제 Word.id
-    for word, payload in words_map.items():
-        new_word_id = None
-        if word not in words_existing_map:
-            new_word = Word(
-                user_id=user_id,
-                word=word,
-                jp_pronunciation=payload.get('jp_pronunciation'),
-                kr_pronunciation=payload.get('kr_pronunciation'),
-                kr_meaning=payload.get('kr_meaning'),
-                level=payload.get('level'),
-            )
-            db.add(new_word)
-            db.flush()
-            created_words.append(word)
-            new_word_id = new_word.id
-            words_existing_map[word] = new_word
-        elif words_existing_map[word].user_id == user_id:
-            # 본인 소유 → 업데이트
-            row = words_existing_map[word]
-            row.jp_pronunciation = payload.get('jp_pronunciation')
-            row.kr_pronunciation = payload.get('kr_pronunciation')
-            row.kr_meaning = payload.get('kr_meaning')
-            row.level = payload.get('level')
-            updated_words.append(row.word)
-            new_word_id = row.id
-        else:
-            # 타인 소유 루트가 있다면 내 소유 분기 생성
-            base = words_existing_map[word]
-            new_word = Word(
-                user_id=user_id,
-                root_word_id=base.id,
-                word=word,
-                jp_pronunciation=payload.get('jp_pronunciation'),
-                kr_pronunciation=payload.get('kr_pronunciation'),
-                kr_meaning=payload.get('kr_meaning'),
-                level=payload.get('level'),
-            )
-            db.add(new_word)
-            db.flush()
-            created_words.append(word)
-            new_word_id = new_word.id
-            words_existing_map[word] = new_word
-
-        word_id_map[word] = new_word_id
-
-        # skill 자동처리 (예: level == 'N/A' → 읽기 100)
-        if payload.get('level') in ['N/A']:
-            existing_skill = db.query(UserWordSkill).filter(
-                UserWordSkill.user_id == user_id,
-                UserWordSkill.word_id == new_word_id
-            ).first()
-            if existing_skill:
-                setattr(existing_skill, 'skill_word_reading', 100)
-                updated_skills.append(word)
-            else:
-                new_skill = UserWordSkill(
-                    user_id=user_id,
-                    word_id=new_word_id,
-                    skill_kanji=0,
-                    skill_word_reading=100,
-                    skill_word_speaking=0,
-                    skill_sentence_reading=0,
-                    skill_sentence_speaking=0,
-                    skill_sentence_listening=0,
-                    is_favorite=False
-                )
-                db.add(new_skill)
-                db.flush()
-                created_skills.append(word)
+    # DB 작업은 동기 세션이므로 서비스 스레드 풀에서 실행 (이벤트 루프를 막지 않도록)
+    result = await run_sync(_upsert_words, data, db, user_id)
+    word_id_map = result.pop("word_id_map")
 
     # ---------- 2) 이미지 업로드 & WordImage 등록 ----------
     created_images = []
     failed_images = []
 
+    # 2-1) 검증 (S3 호출 전에 걸러낸다)
+    jobs = []
     for idx, up in enumerate(files):
         meta = file_meta[idx] if idx < len(file_meta) else {}
         word_text = meta.get("word")
-        tags = meta.get("tags", "")
 
         if not word_text or word_text not in word_id_map:
             failed_images.append({"index": idx, "reason": "unknown word in file_meta"})
@@ -148,63 +191,56 @@ async def create_words_personal(
             continue
 
         word_id = word_id_map[word_text]
-        key = build_object_key(user_id=user_id, word_id=word_id, filename=up.filename or "image")
-
+        jobs.append({
+            "index": idx,
+            "word": word_text,
+            "word_id": word_id,
+            "tags": meta.get("tags", ""),
+            "raw": raw,
+            "content_type": up.content_type,
+            "key": build_object_key(user_id=user_id, word_id=word_id, filename=up.filename or "image"),
+        })
 
-        # 기존 이미지 삭제
-        existing_images = db.query(WordImage).filter(
-            WordImage.user_id == user_id,
-            WordImage.word_id == word_id
-        ).all()
-        print(existing_images, 'existing_images')
-        for old in existing_images:
-            try:
-                if hasattr(old, "object_key") and old.object_key:
-                    delete_object(old.object_key)  # S3 삭제
-            except Exception as e:
-                print("S3 delete failed:", e)
-            db.delete(old)  # DB 삭제
+    # 2-2) 업로드는 S3 스레드 풀에서 동시에
+    upload_results = await asyncio.gather(*[
+        run_s3(upload_fileobj, io.BytesIO(job["raw"]), job["key"], job["content_type"] or "application/octet-stream")
+        for job in jobs
+    ], return_exceptions=True)
 
-         # 이후 새 파일 업로드
-        try:
-            upload_fileobj(io.BytesIO(raw), key, up.content_type or "application/octet-stream")
-        except Exception as e:
-            failed_images.append({"index": idx, "reason": f"S3 upload failed: {e}"})
-            continue
-
-        # presigned 보기 URL (사설 버킷 가정)
-        view_url = presign_get_url(key, expires=3600)
+    uploaded = []
+    for job, res in zip(jobs, upload_results):
+        if isinstance(res, Exception):
+            failed_images.append({"index": job["index"], "reason": f"S3 upload failed: {res}"})
+        else:
+            uploaded.append(job)
 
+    # 2-3) 업로드된 파일만 WordImage 등록 (그 단어들의 기존 이미지 행은 같은 savepoint 에서 삭제)
+    old_keys = []
+    if uploaded:
         try:
-            wi = WordImage(
-                user_id=user_id,
-                word_id=word_id,
-                tags=tags,
-                image_url=view_url,
-                object_key=key,
-                content_type=up.content_type,
-                size_bytes=len(raw),
-            )
-            db.add(wi)
-            db.flush()
-            created_images.append({"index": idx, "word": word_text, "image_id": str(wi.id)})
+            created_images, old_keys = await run_sync(_replace_images, db, user_id, uploaded)
         except Exception as e:
-            # DB 실패 → 업로드 롤백
-            try:
-                delete_object(key)
-            except:
-                pass
-            failed_images.append({"index": idx, "reason": f"DB insert failed: {e}"})
+            # DB 실패 → 업로드 롤백 (기존 이미지는 그대로, 단어 upsert 는 커밋)
+            await asyncio.gather(*[run_s3(_delete_object_quietly, job["key"]) for job in uploaded])
+            failed_images.extend({"index": job["index"], "reason": f"DB insert failed: {e}"} for job in uploaded)
+            uploaded = []
+    failed_images.sort(key=lambda x: x["index"])
 
     # ---------- 3) 커밋 ----------
-    db.commit()
+    try:
+        await run_sync(refresh_word_cards, word_id_map.values(), db)
+        await run_sync(db.commit)
+    except Exception:
+        # 새 이미지 행이 롤백되므로 새로 올린 객체만 지운다 (기존 객체는 기존 행과 함께 남음)
+        await asyncio.gather(*[run_s3(_delete_object_quietly, job["key"]) for job in uploaded])
+        raise
+    # 기존 S3 객체는 교체가 커밋된 뒤에만 지운다
+    await asyncio.gather(*[run_s3(_delete_object_quietly, key) for key in old_keys])
+    await run_sync(word_index.refresh, word_id_map.values())
 
     return {
         "success": True,
-        "created_words": created_words,
-        "updated_words": updated_words,
-        "created_skills": created_skills,
-        "updated_skills": updated_skills,
+        **result,
         "created_images": created_images,
         "failed_images": failed_images,
     }
@@ -226,84 +262,66 @@ def get_random_words_to_learn(limit: int, db: Session, user_id: str):
     Returns:
         우선순위에 따라 정렬된 단어 리스트
     """
-    # level 우선순위를 위한 case 문
-    level_priority = case(
-        (Word.level == 'N5', 1),
-        (Word.level == 'N4', 2),
-        (Word.level == 'N3', 3),
-        (Word.level == 'N2', 4),
-        (Word.level == 'N1', 5),
-        else_=6
+    if limit <= 0:
+        return []
+    # 학습 큐 (level_rank, total_skill 순):
+    #  - 숙련도가 있는 단어: user_word_skills (user_id, level_rank, total_skill) 인덱스를 앞에서부터 limit 개
+    #  - 숙련도가 없는 단어(총합 0): words (level_rank) 인덱스로, limit 번째 미학습 단어의 level 까지만
+    # 양쪽 모두 인덱스 순서로 읽으므로 random() 정렬은 경계의 동점 묶음 안에서만 일어난다 (incremental sort).
+    not_seen = ~exists().where(UserWordSkill.user_id == user_id, UserWordSkill.word_id == Word.id)
+    unseen_bound = (
+        select(Word.level_rank).where(not_seen)
+        .order_by(Word.level_rank).offset(limit - 1).limit(1)
+        .scalar_subquery()
     )
-    
-    # UserWordSkill의 총합을 계산 (없는 경우 0으로 처리)
-    skill_sum = func.coalesce(
-        func.coalesce(UserWordSkill.skill_kanji, 0) +
-        func.coalesce(UserWordSkill.skill_word_reading, 0) +
-        func.coalesce(UserWordSkill.skill_word_speaking, 0) +
-        func.coalesce(UserWordSkill.skill_sentence_reading, 0) +
-        func.coalesce(UserWordSkill.skill_sentence_speaking, 0) +
-        func.coalesce(UserWordSkill.skill_sentence_listening, 0), 0
+    seen = (
+        select(UserWordSkill.word_id.label("word_id"), UserWordSkill.level_rank, UserWordSkill.total_skill)
+        .where(UserWordSkill.user_id == user_id)
+        .order_by(UserWordSkill.level_rank, UserWordSkill.total_skill, func.random())
+        .limit(limit)
     )
-    
-    # 쿼리 실행
-    stmt = (
-        select(Word, level_priority.label('level_priority'), skill_sum.label('total_skill'))
-        .options(
-            selectinload(Word.examples),
-            selectinload(Word.root_word).selectinload(Word.examples)
-        )
-        .outerjoin(UserWordSkill, (UserWordSkill.word_id == Word.id) & (UserWordSkill.user_id == user_id))
-        .order_by(
-            level_priority.asc(),  # level 우선순위 (낮은 숫자가 높은 우선순위)
-            skill_sum.asc(),       # skill 총합이 작은 순
-            func.random()          # 무작위 선택
-        )
+    unseen = (
+        select(Word.id.label("word_id"), Word.level_rank, literal(0).label("total_skill"))
+        .where(not_seen, Word.level_rank <= func.coalesce(unseen_bound, 6))  # 미학습 단어가 limit 개 미만이면 전부
+        .order_by(Word.level_rank, func.random())
         .limit(limit)
     )
-    
-    result = db.execute(stmt).all()
-    print(result, 'result')
-    
-    # Word 객체를 딕셔너리로 변환하여 반환 (순환 참조 방지)
+    queue = union_all(seen, unseen).subquery("queue")
+    word_ids = db.execute(
+        select(queue.c.word_id)
+        .order_by(queue.c.level_rank, queue.c.total_skill, func.random())
+        .limit(limit)
+    ).scalars().all()
+    if not word_ids:
+        return []
+
+    # 카드 (단어 + root_word 사슬 전체의 예문) 를 id 로 한 번에
+    cards = get_word_cards(word_ids, db)
+
     words_data = []
-    for row in result:
-        word = row[0]
-        word_dict = {
-            "id": word.id,
-            "word": word.word,
-            "jp_pronunciation": word.jp_pronunciation,
-            "kr_pronunciation": word.kr_pronunciation,
-            "kr_meaning": word.kr_meaning,
-            "level": word.level,
-            "user_id": word.user_id,
-            "root_word_id": word.root_word_id,
+    for word_id in word_ids:
+        card = cards.get(word_id)
+        if card is None:
+            continue
+        words_data.append({
+            "id": card["id"],
+            "word": card["word"],
+            "jp_pronunciation": card["jp_pronunciation"],
+            "kr_pronunciation": card["kr_pronunciation"],
+            "kr_meaning": card["kr_meaning"],
+            "level": card["level"],
+            "user_id": card["user_id"],
+            "root_word_id": card["root_word_id"],
             "examples": [
                 {
-                    "id": ex.id,
-                    "jp_text": ex.jp_text,
-                    "kr_text": ex.kr_text,
-                    "jp_audio_url": ex.jp_audio_url,
-                    "kr_audio_url": ex.kr_audio_url
-                } for ex in word.examples
-            ] if word.examples else []
-        }
-        
-        # root_word의 예문도 추가
-        if word.root_word and word.root_word.examples:
-            root_examples = [
-                {
-                    "id": ex.id,
-                    "jp_text": ex.jp_text,
-                    "kr_text": ex.kr_text,
-                    "jp_audio_url": ex.jp_audio_url,
-                    "kr_audio_url": ex.kr_audio_url,
-                    "is_root_example": True
-                } for ex in word.root_word.examples
-            ]
-            word_dict["examples"].extend(root_examples)
-        
-        words_data.append(word_dict)
+                    "id": ex["id"],
+                    "tags": ex["tags"],
+                    "jp_text": ex["jp_text"],
+                    "kr_meaning": ex["kr_meaning"],
+                    "is_root_example": ex["depth"] > 0,
+                } for ex in card["examples"]
+            ],
+        })
     
     return words_data 
     
@@ -5,7 +5,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class Settings(BaseModel):
-    db_url: str = os.getenv("ONIGIRI_DB_URL", "") if os.getenv("ONIGIRI_DB_URL", "") else "sqlite:///./../../db.sqlite3"
+    db_url: str = os.getenv("ONIGIRI_DB_URL", "")  # PostgreSQL 필수 (db.py 에서 확인)
+    async_db_url: str = os.getenv("ONIGIRI_ASYNC_DB_URL", "")  # 비우면 db_url 에서 비동기 드라이버로 변환
     google_client_id: str = os.getenv("GOOGLE_CLIENT_ID", "")
     google_client_secret: str = os.getenv("GOOGLE_CLIENT_SECRET", "")
     google_redirect_uri: str = os.getenv("GOOGLE_REDIRECT_URI", "")
@@ -23,5 +24,50 @@ class Settings(BaseModel):
     S3_BUCKET: str = os.getenv("S3_BUCKET", "")
     S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")
     MAX_IMAGE_SIZE_MB: int = 1
+    # 공유 S3 client 설정 (MinIO 등 로컬 호환 서버는 addressing style 을 path 로)
+    S3_ADDRESSING_STYLE: str = os.getenv("S3_ADDRESSING_STYLE", "virtual")
+    S3_MAX_POOL_CONNECTIONS: int = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "20"))
+    S3_TCP_KEEPALIVE: bool = os.getenv("S3_TCP_KEEPALIVE", "true").lower() == "true"
+    # 이미지 업로드/삭제 동시 실행 수 (S3_MAX_POOL_CONNECTIONS 이하로)
+    S3_CONCURRENCY: int = int(os.getenv("S3_CONCURRENCY", "8"))
+    # presigned URL 캐시 (0 이면 사용 안 함), 남은 유효시간이 이 비율 미만이면 재발급
+    PRESIGN_CACHE_SIZE: int = int(os.getenv("PRESIGN_CACHE_SIZE", "10000"))
+    PRESIGN_REFRESH_FRACTION: float = float(os.getenv("PRESIGN_REFRESH_FRACTION", "0.5"))
+
+    # 형태소 분석기(fugashi Tagger) 풀 크기 (워커 프로세스당)
+    TAGGER_POOL_SIZE: int = int(os.getenv("TAGGER_POOL_SIZE", "4"))
+    # 줄 단위 형태소 분석 결과 캐시 (0 이면 사용 안 함)
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "20000"))
+    TOKEN_CACHE_TTL_SECONDS: int = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "86400"))
+    # 동기 서비스 함수 실행용 스레드 풀 (DB 커넥션 풀 크기보다 크지 않게)
+    SERVICE_THREAD_POOL_SIZE: int = int(os.getenv("SERVICE_THREAD_POOL_SIZE", "8"))
+    SERVICE_QUEUE_MAX: int = int(os.getenv("SERVICE_QUEUE_MAX", "200"))  # 초과 시 503, 0 이면 제한 없음
+    # 텍스트 분석용 단어 사전 인덱스 전체 재로딩 주기 (다른 워커의 변경 반영, 0 이면 재로딩 안 함)
+    WORD_INDEX_TTL_SECONDS: int = int(os.getenv("WORD_INDEX_TTL_SECONDS", "300"))
+    # 목록 API 의 total="cached" 전체 개수 재사용 시간
+    COUNT_CACHE_TTL_SECONDS: int = int(os.getenv("COUNT_CACHE_TTL_SECONDS", "60"))
+    # 대량 INSERT 한 문장당 행 수
+    BULK_INSERT_CHUNK_SIZE: int = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "1000"))
+    # 학습 이벤트 write-behind 버퍼: FLUSH_SIZE 개가 모이거나 FLUSH_INTERVAL 마다 multi-row INSERT
+    # (버퍼는 워커 메모리라서 비정상 종료 시 마지막 주기분은 유실될 수 있음, BUFFER_MAX 를 넘으면 요청 스레드에서 바로 기록)
+    LEARNING_EVENT_FLUSH_SIZE: int = int(os.getenv("LEARNING_EVENT_FLUSH_SIZE", "500"))
+    LEARNING_EVENT_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("LEARNING_EVENT_FLUSH_INTERVAL_SECONDS", "2"))
+    LEARNING_EVENT_BUFFER_MAX: int = int(os.getenv("LEARNING_EVENT_BUFFER_MAX", "20000"))
+    # 학습 이벤트 → user_word_skills 집계 주기/한 번에 처리할 이벤트 수 (0 이면 집계 안 함)
+    LEARNING_AGGREGATE_INTERVAL_SECONDS: float = float(os.getenv("LEARNING_AGGREGATE_INTERVAL_SECONDS", "60"))
+    LEARNING_AGGREGATE_BATCH: int = int(os.getenv("LEARNING_AGGREGATE_BATCH", "50000"))
+    # 아직 커밋 안 된 낮은 id 를 건너뛰지 않도록 이 시간보다 오래된 이벤트만 집계
+    LEARNING_AGGREGATE_LAG_SECONDS: int = int(os.getenv("LEARNING_AGGREGATE_LAG_SECONDS", "5"))
+    # 정답/오답 한 번당 숙련도 변화
+    LEARNING_CORRECT_DELTA: int = int(os.getenv("LEARNING_CORRECT_DELTA", "10"))
+    LEARNING_WRONG_DELTA: int = int(os.getenv("LEARNING_WRONG_DELTA", "-5"))
+    # 검증된 세션 캐시 (0 이면 매 요청 DB 조회), 로그아웃은 같은 워커에서 즉시 반영, 다른 워커는 TTL 후
+    SESSION_CACHE_SIZE: int = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+    SESSION_CACHE_TTL_SECONDS: int = int(os.getenv("SESSION_CACHE_TTL_SECONDS", "30"))
+    # sessions.last_seen_at 일괄 갱신 주기 (0 이면 요청마다 바로 갱신)
+    SESSION_TOUCH_INTERVAL_SECONDS: float = float(os.getenv("SESSION_TOUCH_INTERVAL_SECONDS", "30"))
+    # 요청별 SQL 실행 수를 X-SQL-Count 헤더로 (개발/성능 점검용), WARN 개 이상이면 출력 (0 이면 출력 안 함)
+    SQL_COUNT_HEADER: bool = os.getenv("SQL_COUNT_HEADER", "false").lower() == "true"
+    SQL_COUNT_WARN: int = int(os.getenv("SQL_COUNT_WARN", "20"))
 
 settings = Settings()
\ No newline at end of file
@@ -5,7 +5,8 @@ from sqlalchemy import select, update, func
 
 from settings import settings
 from utils.auth_utils import hash_token
-from db import SessionLocal, User, Session as DbSession  # DbSession = 세션 테이블
+from utils.session_cache import session_cache, last_seen_flusher
+from db import SessionLocal, AsyncSessionLocal, User, Role, UserRole, Session as DbSession  # DbSession = 세션 테이블
 
 # 공용 DB 의존성(이미 deps.py가 있다면 그걸 써도 됩니다)
 def get_db():
@@ -15,6 +16,11 @@ def get_db():
     finally:
         db.close()
 
+# 비동기 조회용 DB 의존성 (AsyncSession)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 class CurrentUser:
     """
     라우터에서 필요한 최소 정보만 담아 반환.
@@ -27,39 +33,90 @@ class CurrentUser:
         self.picture_url = picture_url
         self.roles = roles
 
-def _load_user_from_session_cookie(request: Request, db: Session) -> User:
+def principal_stmt(sid_hash: bytes):
     """
-    routes_auth.py 의 /auth/me 와 동일한 규칙으로
-    세션 쿠키를 검증하고 사용자 객체를 반환합니다.
+    세션 해시 → 인증 주체(사용자 기본 컬럼 + 역할 이름) 한 번의 조인으로 조회.
+    역할이 여러 개면 역할마다 한 행, 역할이 없으면 role_name 이 None 인 한 행.
+    (User 의 단어/예문/이미지 등은 건드리지 않으므로 학습량과 무관하게 일정한 비용)
     """
-    cookie_name = settings.session_cookie_name  # routes_auth.py에서 쓰는 것과 동일해야 함
-    raw = request.cookies.get(cookie_name)
-    if not raw:
-        raise HTTPException(status_code=401, detail="no session")
-
-    sid_hash = hash_token(raw)
-    sess = db.scalar(
-        select(DbSession).where(
+    return (
+        select(DbSession.id.label("session_id"), User.id, User.email, User.display_name, User.picture_url,
+               Role.name.label("role_name"))
+        .join(User, User.id == DbSession.user_id)
+        .outerjoin(UserRole, UserRole.user_id == User.id)
+        .outerjoin(Role, Role.id == UserRole.role_id)
+        .where(
             DbSession.session_id_hash == sid_hash,
             DbSession.revoked_at.is_(None),
+            User.is_active.is_(True),
         )
     )
-    if not sess:
-        raise HTTPException(status_code=401, detail="invalid session")
 
-    user = db.get(User, sess.user_id)
-    if not user or not getattr(user, "is_active", True):
-        raise HTTPException(status_code=401, detail="inactive or missing user")
+def rows_to_principal(rows) -> CurrentUser | None:
+    if not rows:
+        return None
+    first = rows[0]
+    return CurrentUser(
+        id=str(first.id),
+        email=first.email,
+        display_name=first.display_name,
+        picture_url=first.picture_url,
+        roles=[row.role_name for row in rows if row.role_name],
+    )
+
+def load_principal(db: Session, sid_hash: bytes, touch: bool = True) -> CurrentUser | None:
+    """
+    검증된 세션은 session_cache 에서 바로 반환하고, last_seen_at 은 last_seen_flusher 가 모아서 갱신.
+    (캐시/flusher 를 끈 설정이면 예전처럼 매번 조회 + 갱신)
+    """
+    cached = session_cache.get(sid_hash)
+    if cached is not None:
+        session_id, principal = cached
+    else:
+        rows = db.execute(principal_stmt(sid_hash)).all()
+        principal = rows_to_principal(rows)
+        if principal is None:
+            return None
+        session_id = str(rows[0].session_id)
+        session_cache.put(sid_hash, session_id, principal)
+
+    if touch and not last_seen_flusher.touch(session_id):
+        # 최근 접속 갱신(선택)
+        db.execute(
+            update(DbSession)
+            .where(DbSession.id == session_id)
+            .values(last_seen_at=func.now())
+        )
+        db.commit()
+    return principal
 
-    # 최근 접속 갱신(선택)
+def revoke_session(db: Session, sid_hash: bytes):
+    # 로그아웃: DB 의 세션을 revoke 하고 이 워커의 캐시/대기 중인 갱신에서도 제거
+    cached = session_cache.get(sid_hash)
+    session_cache.revoke(sid_hash)
+    if cached is not None:
+        last_seen_flusher.discard(cached[0])
     db.execute(
         update(DbSession)
-        .where(DbSession.id == sess.id)
-        .values(last_seen_at=func.now())
+        .where(DbSession.session_id_hash == sid_hash, DbSession.revoked_at.is_(None))
+        .values(revoked_at=func.now())
     )
     db.commit()
 
-    return user
+def _load_user_from_session_cookie(request: Request, db: Session) -> CurrentUser:
+    """
+    routes_auth.py 의 /auth/me 와 동일한 규칙으로
+    세션 쿠키를 검증하고 인증 주체를 반환합니다.
+    """
+    cookie_name = settings.session_cookie_name  # routes_auth.py에서 쓰는 것과 동일해야 함
+    raw = request.cookies.get(cookie_name)
+    if not raw:
+        raise HTTPException(status_code=401, detail="no session")
+
+    principal = load_principal(db, hash_token(raw))
+    if principal is None:
+        raise HTTPException(status_code=401, detail="invalid session")
+    return principal
 
 def get_current_user(
     request: Request,
@@ -71,20 +128,6 @@ def get_current_user(
     인증이 선택인 엔드포인트에서 사용. 세션 없으면 None 반환.
     """
     try:
-        user = _load_user_from_session_cookie(request, db)
+        return _load_user_from_session_cookie(request, db)
     except HTTPException:
         return None
-
-    roles = []
-    if hasattr(user, "user_roles") and user.user_roles:
-        roles = [ur.role.name for ur in user.user_roles if hasattr(ur, "role") and ur.role]
-
-    return CurrentUser(
-        id=str(user.id),
-        email=user.email,
-        display_name=getattr(user, "display_name", None),
-        picture_url=getattr(user, "picture_url", None),
-        roles=roles,
-    )
-
-
@@ -0,0 +1,107 @@
+# bench_s3.py
+# S3 client 재사용 전/후 호출당 비용 비교용 로컬 벤치마크
+#
+#   cd apps/jpkr/api/app
+#   python -m utils.bench_s3 --calls 200 --threads 8
+#
+# 실제 S3/MinIO 대신 같은 프로세스에 간단한 S3 호환 HTTP 서버(PUT/GET/DELETE 만 응답)를 띄운다.
+# --endpoint 를 주면 그 서버(MinIO 등)를 사용한다. (이 경우 --bucket 이 미리 있어야 함)
+import io
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from settings import settings
+from utils import aws_s3
+
+
+class _StandInS3Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive 유지
+    objects = {}
+
+    def _reply(self, status: int, body: bytes = b""):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_PUT(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.objects[self.path] = self.rfile.read(length)
+        self._reply(200)
+
+    def do_GET(self):
+        body = self.objects.get(self.path)
+        self._reply(200, body) if body is not None else self._reply(404)
+
+    def do_DELETE(self):
+        self.objects.pop(self.path, None)
+        self._reply(204)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stand_in_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInS3Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _one_call(get_client, op: str, i: int):
+    s3 = get_client()
+    key = f"bench/{threading.get_ident()}/{i}.png"
+    if op == "presign":
+        s3.generate_presigned_url("get_object", Params={"Bucket": settings.S3_BUCKET, "Key": key}, ExpiresIn=600)
+    elif op == "put":
+        s3.upload_fileobj(io.BytesIO(b"x" * 1024), settings.S3_BUCKET, key)
+    elif op == "delete":
+        s3.delete_object(Bucket=settings.S3_BUCKET, Key=key)
+
+
+def run(get_client, op: str, calls: int, threads: int) -> float:
+    started = time.perf_counter()
+    if threads <= 1:
+        for i in range(calls):
+            _one_call(get_client, op, i)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as ex:
+            list(ex.map(lambda i: _one_call(get_client, op, i), range(calls)))
+    return (time.perf_counter() - started) * 1000 / calls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--endpoint", default="")
+    parser.add_argument("--bucket", default="bench")
+    args = parser.parse_args()
+
+    server = None
+    endpoint = args.endpoint
+    if not endpoint:
+        server, endpoint = start_stand_in_server()
+    settings.S3_ENDPOINT_URL = endpoint
+    settings.S3_BUCKET = args.bucket
+    settings.S3_ADDRESSING_STYLE = "path"
+    settings.AWS_ACCESS_KEY_ID = settings.AWS_ACCESS_KEY_ID or "bench"
+    settings.AWS_SECRET_ACCESS_KEY = settings.AWS_SECRET_ACCESS_KEY or "bench"
+
+    print(f"endpoint={endpoint} calls={args.calls} threads={args.threads} "
+          f"max_pool_connections={settings.S3_MAX_POOL_CONNECTIONS} tcp_keepalive={settings.S3_TCP_KEEPALIVE}")
+    print(f"{'op':<8} {'per-call client (ms)':>22} {'shared client (ms)':>20} {'speedup':>8}")
+    for op in ("presign", "put", "delete"):
+        before = run(aws_s3.new_s3_client, op, args.calls, args.threads)
+        after = run(aws_s3.get_s3, op, args.calls, args.threads)
+        print(f"{op:<8} {before:>22.3f} {after:>20.3f} {before / after if after else 0:>7.1f}x")
+
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+# bulk.py
+import uuid
+from typing import List, Dict, Any
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from settings import settings
+
+# 여러 행을 multi-row INSERT ... VALUES (...), (...) 로 넣는다.
+# 행마다 add()/flush() 하면 행 수만큼 왕복하므로, 큰 입력은 chunk 단위 문장 몇 개로 끝낸다.
+# (chunk 크기 × 컬럼 수가 바인드 파라미터 한도 65535 를 넘지 않게)
+
+def insert_with_ids(db, model, rows: List[Dict[str, Any]], chunk_size: int = None) -> List[str]:
+    """
+    UUID 기본 키 모델용. 행마다 새 id 를 만들어 넣고 (rows 에 id 가 있어도 덮어씀) 입력 순서대로 돌려준다.
+    (RETURNING 을 쓰지 않음 - multi-row INSERT ... RETURNING 의 반환 순서는 VALUES 순서가 보장되지 않음)
+    """
+    rows = [{**row, "id": str(uuid.uuid4())} for row in rows]
+    insert_rows(db, model, rows, chunk_size)
+    return [row["id"] for row in rows]
+
+def insert_rows(db, model, rows: List[Dict[str, Any]], chunk_size: int = None) -> int:
+    # 생성 id 가 필요 없을 때 (RETURNING 없이)
+    chunk_size = max(1, int(chunk_size or settings.BULK_INSERT_CHUNK_SIZE))
+    for start in range(0, len(rows), chunk_size):
+        db.execute(pg_insert(model).values(rows[start:start + chunk_size]))
+    return len(rows)
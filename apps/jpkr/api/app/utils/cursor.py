@@ -0,0 +1,22 @@
+# cursor.py
+import json
+import base64
+from typing import Any, List
+from fastapi import HTTPException
+
+# keyset 페이지네이션용 커서
+# 마지막 행의 정렬 키 값들을 JSON → base64url 로 감싼 불투명한 문자열로 주고받는다.
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
@@ -0,0 +1,80 @@
+# dedupe_words.py
+# 같은 사용자에게 같은 단어(words.user_id, words.word)가 여러 개 있어 uq_words_user_id_word 를 만들지 못할 때 정리용
+#
+#   cd apps/jpkr/api/app
+#   python -m utils.dedupe_words            # 중복 목록만 출력
+#   python -m utils.dedupe_words --apply    # 합치고 커밋
+#
+# 키마다 가장 먼저 만든 단어를 남기고, 나머지 단어에 딸린 데이터를 그쪽으로 옮긴 뒤 지운다.
+#   - examples, word_images, learning_events, 다른 단어의 root_word_id → 남기는 단어로
+#   - user_word_skills → 사용자별로 한 행으로 합침 (숙련도는 최댓값, 즐겨찾기는 OR, 가장 최근에 갱신된 행을 남김)
+#   - word_cards → 관련 카드를 지운다 (서버 시작 시 build_missing_word_cards 가 다시 만든다)
+# 남기는 단어의 발음/뜻/레벨은 그대로 둔다.
+import argparse
+
+from db import engine, SKILL_COLUMNS
+
+_SKILLS = ", ".join(SKILL_COLUMNS)
+
+STEPS = [
+    # 지울 단어 -> 남길 단어
+    ("words to merge", """CREATE TEMP TABLE word_dups ON COMMIT DROP AS
+SELECT id AS dup_id, keep_id FROM (
+    SELECT id, first_value(id) OVER (PARTITION BY user_id, word ORDER BY created_at, id) AS keep_id
+    FROM words WHERE user_id IS NOT NULL
+) w WHERE id <> keep_id"""),
+    ("examples moved", "UPDATE examples e SET word_id = d.keep_id FROM word_dups d WHERE e.word_id = d.dup_id"),
+    ("word_images moved", "UPDATE word_images i SET word_id = d.keep_id FROM word_dups d WHERE i.word_id = d.dup_id"),
+    ("learning_events moved", "UPDATE learning_events l SET word_id = d.keep_id FROM word_dups d WHERE l.word_id = d.dup_id"),
+    ("root_word_id moved", "UPDATE words w SET root_word_id = d.keep_id FROM word_dups d WHERE w.root_word_id = d.dup_id"),
+    # 남긴 단어가 자기 자신을 root 로 가리키게 된 경우
+    ("self roots cleared", "UPDATE words SET root_word_id = NULL WHERE root_word_id = id"),
+    # 숙련도: (user_id, 남길 단어) 별로 합친 값을 먼저 계산해 두고, 남길 행 외에는 지운 뒤 갱신 (unique 인덱스 충돌 방지)
+    ("skill groups", f"""CREATE TEMP TABLE skill_merge ON COMMIT DROP AS
+SELECT user_id, target_word_id,
+       (array_agg(id ORDER BY updated_at DESC NULLS LAST, id DESC))[1] AS keep_skill_id,
+       {", ".join(f"max({c}) AS {c}" for c in SKILL_COLUMNS)},
+       bool_or(is_favorite) AS is_favorite,
+       array_agg(id) AS skill_ids
+FROM (
+    SELECT s.id, s.user_id, coalesce(d.keep_id, s.word_id) AS target_word_id, s.updated_at, {_SKILLS}, s.is_favorite
+    FROM user_word_skills s
+    LEFT JOIN word_dups d ON d.dup_id = s.word_id
+    WHERE s.word_id IN (SELECT dup_id FROM word_dups UNION SELECT keep_id FROM word_dups)
+) s
+GROUP BY user_id, target_word_id"""),
+    ("user_word_skills removed", """DELETE FROM user_word_skills s USING skill_merge m
+WHERE s.id = ANY(m.skill_ids) AND s.id <> m.keep_skill_id"""),
+    ("user_word_skills merged", f"""UPDATE user_word_skills s
+SET word_id = m.target_word_id, {", ".join(f"{c} = m.{c}" for c in SKILL_COLUMNS)}, is_favorite = m.is_favorite
+FROM skill_merge m WHERE s.id = m.keep_skill_id"""),
+    ("word_cards removed", """DELETE FROM word_cards c WHERE c.word_id IN (SELECT keep_id FROM word_dups)
+   OR c.chain_ids && ARRAY(SELECT dup_id FROM word_dups UNION SELECT keep_id FROM word_dups)"""),
+    ("words removed", "DELETE FROM words w USING word_dups d WHERE w.id = d.dup_id"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="merge duplicate (user_id, word) rows in words")
+    parser.add_argument("--apply", action="store_true", help="merge and commit (default: only list duplicates)")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        rows = conn.exec_driver_sql(
+            "SELECT user_id, word, count(*) FROM words WHERE user_id IS NOT NULL "
+            "GROUP BY user_id, word HAVING count(*) > 1 ORDER BY user_id, word"
+        ).all()
+        for user_id, word, n in rows:
+            print(f"{user_id}  {word}  x{n}")
+        print(f"{len(rows)} duplicate keys")
+        if not rows or not args.apply:
+            return
+
+        for name, sql in STEPS:
+            result = conn.exec_driver_sql(sql)
+            print(f"{name}: {result.rowcount}")
+        print("done. restart the server to build uq_words_user_id_word and the removed word cards")
+
+
+if __name__ == "__main__":
+    main()
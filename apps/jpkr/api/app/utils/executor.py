@@ -0,0 +1,121 @@
+# executor.py
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Any
+from fastapi import HTTPException
+
+from settings import settings
+
+# 서비스 함수들은 동기(SQLAlchemy, fugashi, boto3)라서 이벤트 루프에서 바로 호출하면
+# 워커 하나가 요청 하나에 묶인다. 크기가 정해진 스레드 풀로 넘겨서 실행한다.
+
+class ServiceExecutor:
+    def __init__(self, size: int, max_queue: int = 0):
+        self.size = max(1, int(size))
+        self.max_queue = max(0, int(max_queue))  # 0 이면 대기열 제한 없음
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="service")
+        self._lock = threading.Lock()
+        # metrics
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+        self._queue_max_seen = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            if self.max_queue and self._queued >= self.max_queue:
+                self._rejected += 1
+                raise HTTPException(status_code=503, detail="Server is busy")
+            self._queued += 1
+            if self._queued > self._queue_max_seen:
+                self._queue_max_seen = self._queued
+        submitted = time.perf_counter()
+        dequeued = [False]  # 대기열에서 뺀 쪽(task 시작 또는 취소)이 한 번만 _queued 를 줄인다
+
+        def dequeue():
+            if not dequeued[0]:
+                dequeued[0] = True
+                self._queued -= 1
+
+        def task():
+            waited = time.perf_counter() - submitted
+            with self._lock:
+                dequeue()
+                self._active += 1
+                self._wait_total += waited
+                if waited > self._wait_max:
+                    self._wait_max = waited
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+
+        ctx = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, ctx.run, task)
+        finally:
+            # 시작 전에 취소되면 (타임아웃, 연결 끊김) task 가 돌지 않으므로 여기서 대기열 수를 되돌린다
+            with self._lock:
+                dequeue()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            started = self._completed + self._active
+            return {
+                "size": self.size,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "queue_depth_max": self._queue_max_seen,
+                "active": self._active,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "wait_avg_ms": round(self._wait_total / started * 1000, 3) if started else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+            }
+
+
+_service_executor: Optional[ServiceExecutor] = None
+_init_lock = threading.Lock()
+
+def init_service_executor(size: Optional[int] = None, max_queue: Optional[int] = None) -> ServiceExecutor:
+    """서버 시작 시(initserver.start) 호출."""
+    global _service_executor
+    with _init_lock:
+        if _service_executor is None:
+            _service_executor = ServiceExecutor(
+                size if size is not None else settings.SERVICE_THREAD_POOL_SIZE,
+                max_queue if max_queue is not None else settings.SERVICE_QUEUE_MAX,
+            )
+        return _service_executor
+
+def get_service_executor() -> ServiceExecutor:
+    if _service_executor is None:
+        return init_service_executor()
+    return _service_executor
+
+def shutdown_service_executor():
+    global _service_executor
+    with _init_lock:
+        if _service_executor is not None:
+            _service_executor.shutdown()
+            _service_executor = None
+
+async def run_sync(func: Callable[..., Any], *args, **kwargs) -> Any:
+    return await get_service_executor().run(func, *args, **kwargs)
+
+def get_service_executor_stats() -> dict:
+    if _service_executor is None:
+        return {"size": 0}
+    return _service_executor.stats()
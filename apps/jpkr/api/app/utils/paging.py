@@ -0,0 +1,99 @@
+# paging.py
+import time
+import threading
+from datetime import datetime
+from typing import Optional, Dict, Tuple
+from sqlalchemy import select, func, and_, or_, text
+from fastapi import HTTPException
+
+from settings import settings
+from utils.cursor import encode_cursor, decode_cursor
+
+# 관리자 테이블 목록용 keyset 페이지네이션 + 전체 개수
+# OFFSET 은 뒤 페이지일수록 앞 행을 모두 건너뛰어야 하므로 (created_at, id) 기준으로 이어서 읽는다.
+
+def keyset_after(created_col, id_col, cursor: Optional[str]):
+    # cursor 가 가리키는 행 다음부터 (created_at, id) 오름차순
+    if not cursor:
+        return None
+    created_at, last_id = decode_cursor(cursor, 2)
+    try:
+        created_at = datetime.fromisoformat(created_at)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return or_(created_col > created_at, and_(created_col == created_at, id_col > last_id))
+
+def next_keyset_cursor(rows, limit: Optional[int]) -> Tuple[list, Optional[str]]:
+    # limit + 1 개를 읽었을 때 다음 페이지가 있으면 마지막 행으로 커서를 만든다
+    if not limit or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last["created_at"].isoformat(), last["id"])
+
+
+def _estimated_count_stmt(table_name: str):
+    # 플래너 통계 기반 행 수 (ANALYZE 전이면 -1)
+    return text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)").bindparams(table=table_name)
+
+def _exact_count_stmt(model):
+    return select(func.count()).select_from(model)
+
+
+class CountCache:
+    # 정확한 count() 결과를 TTL 동안 재사용 (total="cached")
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = max(0, int(ttl_seconds))
+        self._data: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[int]:
+        with self._lock:
+            item = self._data.get(name)
+        if item is None or time.monotonic() - item[0] > self.ttl_seconds:
+            return None
+        return item[1]
+
+    def put(self, name: str, value: int):
+        with self._lock:
+            self._data[name] = (time.monotonic(), value)
+
+
+count_cache = CountCache(settings.COUNT_CACHE_TTL_SECONDS)
+
+
+# total: "exact" (매번 count), "cached" (count 를 TTL 동안 재사용),
+#        "estimated" (pg_class 통계, 통계가 없으면 cached), "none" (세지 않음)
+def get_total_count(db, model, total: str = "exact") -> Optional[int]:
+    if total == "none":
+        return None
+    name = model.__tablename__
+    if total == "estimated":
+        estimated = db.execute(_estimated_count_stmt(name)).scalar()
+        if estimated is not None and estimated >= 0:
+            return estimated
+        total = "cached"
+    if total == "cached":
+        cached = count_cache.get(name)
+        if cached is not None:
+            return cached
+    value = db.execute(_exact_count_stmt(model)).scalar_one()
+    count_cache.put(name, value)
+    return value
+
+async def get_total_count_async(db, model, total: str = "exact") -> Optional[int]:
+    if total == "none":
+        return None
+    name = model.__tablename__
+    if total == "estimated":
+        estimated = (await db.execute(_estimated_count_stmt(name))).scalar()
+        if estimated is not None and estimated >= 0:
+            return estimated
+        total = "cached"
+    if total == "cached":
+        cached = count_cache.get(name)
+        if cached is not None:
+            return cached
+    value = (await db.execute(_exact_count_stmt(model))).scalar_one()
+    count_cache.put(name, value)
+    return value
@@ -0,0 +1,177 @@
+# session_cache.py
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional, Dict
+
+from sqlalchemy import update, bindparam
+
+from settings import settings
+from db import SessionLocal, Session as DbSession
+
+# 인증된 요청마다 sessions 조회 + last_seen_at UPDATE + COMMIT 을 하지 않도록
+#  - 검증된 세션(해시 → 인증 주체)을 워커 메모리에 TTL 동안 보관하고
+#  - last_seen_at 은 모아 두었다가 백그라운드 스레드가 주기적으로 한 번에 갱신한다.
+# 로그아웃한 세션은 같은 워커에서는 즉시 제거된다.
+# 다른 워커의 캐시에는 최대 SESSION_CACHE_TTL_SECONDS 동안 남을 수 있으므로 TTL 은 짧게 둔다.
+
+
+class SessionCache:
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max(0, int(max_size))
+        self.ttl_seconds = max(0, int(ttl_seconds))
+        self._data: "OrderedDict[bytes, tuple]" = OrderedDict()  # sid_hash -> (stored_at, session_id, principal)
+        self._lock = threading.Lock()
+        # metrics
+        self._hits = 0
+        self._misses = 0
+        self._revoked = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def get(self, sid_hash: bytes) -> Optional[tuple]:
+        # (session_id, principal) 또는 None
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(sid_hash)
+            if item is None or now - item[0] > self.ttl_seconds:
+                if item is not None:
+                    del self._data[sid_hash]
+                self._misses += 1
+                return None
+            self._data.move_to_end(sid_hash)
+            self._hits += 1
+            return item[1], item[2]
+
+    def put(self, sid_hash: bytes, session_id: str, principal):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[sid_hash] = (time.monotonic(), session_id, principal)
+            self._data.move_to_end(sid_hash)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def revoke(self, sid_hash: bytes):
+        with self._lock:
+            if self._data.pop(sid_hash, None) is not None:
+                self._revoked += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "revoked": self._revoked,
+            }
+
+
+class LastSeenFlusher:
+    """
+    touch(session_id) 는 메모리에 시각만 기록하고,
+    interval 마다 모인 세션들의 last_seen_at 을 executemany UPDATE 한 번 + COMMIT 한 번으로 반영한다.
+    interval 이 0 이면 사용하지 않는다 (touch 가 False 를 돌려주면 호출 측에서 바로 UPDATE).
+    """
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = max(0.0, float(interval_seconds))
+        self._pending: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # metrics
+        self._touches = 0
+        self._flushes = 0
+        self._flushed_rows = 0
+        self._errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval_seconds > 0
+
+    def touch(self, session_id: str) -> bool:
+        if not self.enabled:
+            return False
+        with self._lock:
+            self._pending[session_id] = datetime.now(timezone.utc)
+            self._touches += 1
+        return True
+
+    def discard(self, session_id: str):
+        with self._lock:
+            self._pending.pop(session_id, None)
+
+    def flush(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        stmt = (
+            update(DbSession)
+            .where(DbSession.id == bindparam("b_id"))
+            .values(last_seen_at=bindparam("b_seen"))
+        )
+        params = [{"b_id": sid, "b_seen": seen} for sid, seen in pending.items()]
+        try:
+            with SessionLocal() as db:
+                db.connection().execute(stmt, params)
+                db.commit()
+        except Exception as e:
+            # 실패한 것은 다음 주기에 다시 (그 사이 새로 touch 된 값이 있으면 그쪽 우선)
+            with self._lock:
+                for sid, seen in pending.items():
+                    self._pending.setdefault(sid, seen)
+                self._errors += 1
+            print("last_seen_at flush failed:", e)
+            return 0
+        with self._lock:
+            self._flushes += 1
+            self._flushed_rows += len(params)
+        return len(params)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.flush()
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="last-seen-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # 종료 시 남은 것까지 반영
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "interval_seconds": self.interval_seconds,
+                "pending": len(self._pending),
+                "touches": self._touches,
+                "flushes": self._flushes,
+                "flushed_rows": self._flushed_rows,
+                "errors": self._errors,
+            }
+
+
+session_cache = SessionCache(settings.SESSION_CACHE_SIZE, settings.SESSION_CACHE_TTL_SECONDS)
+last_seen_flusher = LastSeenFlusher(settings.SESSION_TOUCH_INTERVAL_SECONDS)
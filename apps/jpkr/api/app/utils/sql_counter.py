@@ -0,0 +1,70 @@
+# sql_counter.py
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Optional, List
+from sqlalchemy import event
+
+# 요청(또는 임의 코드 블록)마다 실행된 SQL 수를 센다.
+# 서비스 스레드 풀/AsyncSession 모두 contextvars 를 이어받으므로 같은 카운터에 쌓인다.
+#
+#   with count_sql() as counter:
+#       get_all_words(limit=50, db=db)
+#   print(counter.count, counter.statements)
+#
+# 서버에서는 SQL_COUNT_HEADER=true 이면 응답에 X-SQL-Count 헤더를 붙이고,
+# SQL_COUNT_WARN 개 이상이면 경로와 함께 출력한다.
+
+class SqlCounter:
+    def __init__(self, keep_statements: bool = False):
+        self.count = 0
+        self.keep_statements = keep_statements
+        self.statements: List[str] = []
+        self._lock = threading.Lock()
+
+    def add(self, statement: str):
+        with self._lock:
+            self.count += 1
+            if self.keep_statements:
+                self.statements.append(statement)
+
+
+_current: contextvars.ContextVar[Optional[SqlCounter]] = contextvars.ContextVar("sql_counter", default=None)
+_installed = set()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _current.get()
+    if counter is not None:
+        counter.add(statement)
+
+def install_sql_counter(*engines):
+    """엔진에 카운터 리스너 등록 (AsyncEngine 은 sync_engine 에 등록)"""
+    for engine in engines:
+        engine = getattr(engine, "sync_engine", engine)
+        if id(engine) in _installed:
+            continue
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        _installed.add(id(engine))
+
+@contextmanager
+def count_sql(keep_statements: bool = False):
+    counter = SqlCounter(keep_statements)
+    token = _current.set(counter)
+    try:
+        yield counter
+    finally:
+        _current.reset(token)
+
+
+def sql_count_middleware(warn_at: int = 0):
+    async def middleware(request, call_next):
+        started = time.perf_counter()
+        with count_sql() as counter:
+            response = await call_next(request)
+        response.headers["X-SQL-Count"] = str(counter.count)
+        if warn_at and counter.count >= warn_at:
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"[sql-count] {request.method} {request.url.path} -> {counter.count} queries ({elapsed:.1f} ms)")
+        return response
+    return middleware
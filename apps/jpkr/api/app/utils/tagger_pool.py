@@ -0,0 +1,80 @@
+# tagger_pool.py
+import time
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Optional
+from fugashi import Tagger
+
+from settings import settings
+
+# fugashi.Tagger 는 생성 시 unidic-lite 사전을 로드하므로 비용이 크다.
+# 서버 시작 시 한 번만 만들어 두고 요청마다 빌려 쓰고 돌려준다.
+# (Tagger 인스턴스는 스레드 간 동시 사용이 안전하지 않으므로 한 번에 한 요청만 사용)
+
+class TaggerPool:
+    def __init__(self, size: int):
+        self.size = max(1, int(size))
+        self._pool: "queue.Queue[Tagger]" = queue.Queue(maxsize=self.size)
+        self._lock = threading.Lock()
+        for _ in range(self.size):
+            self._pool.put(Tagger())  # unidic-lite 자동 사용
+        # metrics
+        self._acquired = 0
+        self._waited = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        started = time.perf_counter()
+        tagger = self._pool.get(timeout=timeout)
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._acquired += 1
+            self._wait_total += waited
+            if waited > 0.001:
+                self._waited += 1
+            if waited > self._wait_max:
+                self._wait_max = waited
+        try:
+            yield tagger
+        finally:
+            self._pool.put(tagger)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "available": self._pool.qsize(),
+                "acquired": self._acquired,
+                "waited": self._waited,
+                "wait_avg_ms": round(self._wait_total / self._acquired * 1000, 3) if self._acquired else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+            }
+
+
+_tagger_pool: Optional[TaggerPool] = None
+_init_lock = threading.Lock()
+
+def init_tagger_pool(size: Optional[int] = None) -> TaggerPool:
+    """서버 시작 시(initserver.start) 호출. 이미 만들어져 있으면 그대로 사용."""
+    global _tagger_pool
+    with _init_lock:
+        if _tagger_pool is None:
+            _tagger_pool = TaggerPool(size if size is not None else settings.TAGGER_POOL_SIZE)
+        return _tagger_pool
+
+def get_tagger_pool() -> TaggerPool:
+    # start() 를 거치지 않은 경우(스크립트 등)에는 처음 사용할 때 생성
+    if _tagger_pool is None:
+        return init_tagger_pool()
+    return _tagger_pool
+
+def acquire_tagger(timeout: Optional[float] = None):
+    return get_tagger_pool().acquire(timeout=timeout)
+
+def get_tagger_pool_stats() -> dict:
+    if _tagger_pool is None:
+        return {"size": 0}
+    return _tagger_pool.stats()
@@ -0,0 +1,83 @@
+# token_cache.py
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any
+
+from settings import settings
+
+# 가사는 후렴구처럼 같은 줄이 반복되고, 같은 노래를 여러 사용자가 분석한다.
+# 줄 단위 형태소 분석 결과를 프로세스 메모리에 LRU + TTL 로 보관해서
+# 같은 줄은 Tagger 를 거치지 않도록 한다.
+
+def normalize_line(line: str) -> str:
+    # 캐시 키와 실제 분석 입력을 같게 맞춘다 (Windows 줄바꿈 \r, 앞뒤 공백 제거)
+    return unicodedata.normalize("NFC", line).strip()
+
+def line_key(normalized_line: str) -> str:
+    return hashlib.blake2b(normalized_line.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class LineTokenCache:
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max(0, int(max_size))
+        self.ttl_seconds = max(0, int(ttl_seconds))
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (stored_at, tokens)
+        self._lock = threading.Lock()
+        # metrics
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        if self.max_size == 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self._misses += 1
+                return None
+            stored_at, tokens = item
+            if self.ttl_seconds and now - stored_at > self.ttl_seconds:
+                del self._data[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+            return tokens
+
+    def put(self, key: str, tokens: List[Dict[str, Any]]):
+        if self.max_size == 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), tokens)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+
+line_token_cache = LineTokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL_SECONDS)
@@ -0,0 +1,11 @@
+# conftest.py
+# 테스트 공통 설정 - app 모듈을 import 하기 전에 적용되어야 한다.
+#  - 단위 테스트는 DB 에 접속하지 않지만 db.py 가 import 시 엔진을 만들므로 PostgreSQL URL 이 필요하다.
+#    (접속하지 않는 자리표시 URL, ONIGIRI_TEST_DB_URL 이 있으면 그것을 사용)
+#  - 쿼리 수 테스트가 세션 조회까지 세도록 세션 캐시는 끈다.
+import os
+import sys
+
+os.environ["ONIGIRI_DB_URL"] = os.getenv("ONIGIRI_TEST_DB_URL", "") or "postgresql+psycopg://localhost/onigiri_unit_tests"
+os.environ.setdefault("SESSION_CACHE_TTL_SECONDS", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
@@ -0,0 +1,35 @@
+# test_cursor.py
+# keyset 커서 encode/decode (DB 불필요)
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from utils.cursor import encode_cursor, decode_cursor
+
+
+def test_round_trip():
+    created_at = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    cursor = encode_cursor(created_at, "3f1c", 7)
+    # 날짜는 문자열로 직렬화된다
+    assert decode_cursor(cursor, 3) == [str(created_at), "3f1c", 7]
+
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor("단어", "??>>")
+    assert "=" not in cursor
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+    assert decode_cursor(cursor, 2) == ["단어", "??>>"]
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", encode_cursor(1, 2)[:-3] + "!!!", ""])
+def test_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(cursor, 2)
+    assert e.value.status_code == 400
+
+
+def test_wrong_size():
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(encode_cursor("a", "b"), 3)
+    assert e.value.status_code == 400
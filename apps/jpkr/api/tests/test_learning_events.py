@@ -0,0 +1,83 @@
+# test_learning_events.py
+# 학습 이벤트 버퍼: 기록 실패 시 되돌려 넣기 / 스레드 없는 모드의 실패 응답 (DB 대신 기록 함수를 바꿔 끼움)
+import pytest
+from fastapi import HTTPException
+
+from service import learning_events
+from service.learning_events import LearningEventBuffer
+
+
+class _Session:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def commit(self):
+        pass
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """기록된 행 목록, store.fail = True 이면 기록 실패"""
+    class Store(list):
+        fail = False
+
+    written = Store()
+
+    def insert_rows(db, model, rows):
+        if written.fail:
+            raise RuntimeError("database is down")
+        written.extend(rows)
+
+    monkeypatch.setattr(learning_events, "SessionLocal", _Session)
+    monkeypatch.setattr(learning_events, "insert_rows", insert_rows)
+    return written
+
+
+@pytest.fixture
+def buffer():
+    # 주기는 길게 - flush 는 테스트에서 직접 부른다
+    buffer = LearningEventBuffer(flush_size=5, interval_seconds=3600, max_size=5)
+    buffer.start()
+    yield buffer
+    buffer.stop()
+
+
+def test_failed_flush_requeues_rows_in_order(store, buffer):
+    store.fail = True
+    assert buffer.add([{"n": 1}, {"n": 2}]) == 2
+    assert buffer.flush() == 0
+    assert buffer.stats()["pending"] == 2
+    assert buffer.stats()["errors"] == 1
+
+    buffer.add([{"n": 3}])
+    store.fail = False
+    assert buffer.flush() == 3
+    assert [row["n"] for row in store] == [1, 2, 3]
+    assert buffer.stats()["pending"] == 0
+
+
+def test_full_buffer_rejects_when_flush_fails(store, buffer):
+    store.fail = True
+    buffer.add([{"n": i} for i in range(4)])
+    with pytest.raises(HTTPException) as e:
+        buffer.add([{"n": 4}, {"n": 5}])
+    assert e.value.status_code == 503
+    assert buffer.stats()["pending"] == 4
+    assert buffer.stats()["rejected"] == 2
+
+
+def test_without_thread_write_failure_is_reported(store):
+    buffer = LearningEventBuffer(flush_size=100, interval_seconds=0, max_size=5)
+    store.fail = True
+    with pytest.raises(HTTPException) as e:
+        buffer.add([{"n": 1}])
+    assert e.value.status_code == 503
+    # 실패로 응답한 행은 남기지 않는다
+    assert buffer.stats()["pending"] == 0
+
+    store.fail = False
+    assert buffer.add([{"n": 2}]) == 1
+    assert [row["n"] for row in store] == [2]
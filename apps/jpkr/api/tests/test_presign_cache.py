@@ -0,0 +1,56 @@
+# test_presign_cache.py
+# presigned URL 캐시: 유효시간별 보관, 재발급 시점, LRU (S3 불필요)
+import time
+
+from utils.aws_s3 import PresignCache
+
+
+def test_hit_only_for_same_expiry():
+    cache = PresignCache(max_size=10, refresh_fraction=0.5)
+    cache.put("k", "url-3600", time.time(), 3600)
+    assert cache.get("k", 3600) == "url-3600"
+    # 요청한 것보다 오래 유효한 URL 은 내주지 않는다
+    assert cache.get("k", 60) is None
+    cache.put("k", "url-60", time.time(), 60)
+    assert cache.get("k", 60) == "url-60"
+    assert cache.get("k", 3600) == "url-3600"
+
+
+def test_reissue_when_remaining_below_refresh_fraction():
+    cache = PresignCache(max_size=10, refresh_fraction=0.5)
+    now = time.time()
+    cache.put("fresh", "u1", now - 1000, 3600)  # 2600초 남음
+    cache.put("stale", "u2", now - 2000, 3600)  # 1600초 남음 (< 1800)
+    cache.put("expired", "u3", now - 4000, 3600)
+    assert cache.get("fresh", 3600) == "u1"
+    assert cache.get("stale", 3600) is None
+    assert cache.get("expired", 3600) is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 2)
+
+
+def test_evicts_least_recently_used_key():
+    cache = PresignCache(max_size=2, refresh_fraction=0.5)
+    now = time.time()
+    cache.put("a", "ua", now, 3600)
+    cache.put("b", "ub", now, 3600)
+    assert cache.get("a", 3600) == "ua"
+    cache.put("c", "uc", now, 3600)
+    assert cache.get("b", 3600) is None
+    assert cache.get("a", 3600) == "ua"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_drops_every_expiry():
+    cache = PresignCache(max_size=10, refresh_fraction=0.5)
+    now = time.time()
+    cache.put("k", "u1", now, 3600)
+    cache.put("k", "u2", now, 60)
+    cache.invalidate("k")
+    assert cache.get("k", 3600) is None
+    assert cache.get("k", 60) is None
+
+
+def test_disabled():
+    cache = PresignCache(max_size=0, refresh_fraction=0.5)
+    cache.put("k", "u", time.time(), 3600)
+    assert cache.get("k", 3600) is None
@@ -0,0 +1,106 @@
+# test_query_budgets.py
+# 주요 엔드포인트가 실행하는 SQL 수 상한 (N+1 회귀 방지)
+# 데이터 양을 늘려도 쿼리 수가 늘지 않아야 한다.
+#
+#   ONIGIRI_TEST_DB_URL=postgresql+psycopg://... pytest apps/jpkr/api/tests
+#
+# 비어 있는 테스트용 PostgreSQL DB 를 지정해야 하며, 없으면 건너뛴다.
+import os
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+# ONIGIRI_DB_URL / sys.path 는 conftest.py 에서 설정
+if not os.getenv("ONIGIRI_TEST_DB_URL", ""):
+    pytest.skip("ONIGIRI_TEST_DB_URL is not set", allow_module_level=True)
+
+from fastapi.testclient import TestClient
+
+import main
+from db import SessionLocal, User, Role, UserRole, Word, Session as DbSession
+from utils.auth_utils import hash_token
+from utils.sql_counter import count_sql
+
+WORDS_PER_USER = 30
+
+
+def _make_user(db, roles):
+    user = User(email=f"{uuid.uuid4().hex[:8]}@test.local", display_name="tester")
+    db.add(user)
+    db.flush()
+    for name in roles:
+        role = db.query(Role).filter(Role.name == name).first()
+        if role is None:
+            role = Role(name=name)
+            db.add(role)
+            db.flush()
+        db.add(UserRole(user_id=user.id, role_id=role.id))
+    raw = uuid.uuid4().hex
+    db.add(DbSession(user_id=user.id, session_id_hash=hash_token(raw)))
+    return user, raw
+
+
+def _seed_words(client, count):
+    """단어 count 개(+ 본문 분석에 걸리는 "犬")와 단어별 예문 하나를 API 로 만든다 (카드 갱신까지 포함)"""
+    words = ["犬"] + [f"語{uuid.uuid4().hex[:6]}" for _ in range(count)]
+    data = [{"word": w, "jp_pronunciation": "ご", "kr_pronunciation": "고", "kr_meaning": "말", "level": "N5"} for w in words]
+    response = client.post("/words/create/batch", json=data)
+    assert response.status_code == 200, response.text
+    with SessionLocal() as db:
+        word_ids = db.execute(select(Word.id).where(Word.word.in_(words))).scalars().all()
+    examples = [{"word_id": word_id, "tags": "", "jp_text": "例文です", "kr_meaning": "예문"} for word_id in word_ids]
+    response = client.post("/examples/create/batch", json=examples)
+    assert response.status_code == 200, response.text
+    response = client.post("/user_word_skill/upsert/batch", json=[{"word_id": word_id, "skill_kanji": 10} for word_id in word_ids[:10]])
+    assert response.status_code == 200, response.text
+    return word_ids
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        with SessionLocal() as db:
+            _, sid = _make_user(db, ("admin", "user"))
+            db.commit()
+        client.cookies.set("sid", sid)
+        _seed_words(client, WORDS_PER_USER)
+        yield client
+
+
+def _queries(client, method, url, **kwargs):
+    with count_sql(keep_statements=True) as counter:
+        response = client.request(method, url, **kwargs)
+    assert response.status_code == 200, response.text
+    return counter
+
+
+# (method, url, body, 상한) - 인증(세션 조회) 포함
+# total 기본값(cached)은 캐시가 비어 있으면 추정치 + 정확한 count 를 한 번 더 읽는다
+BUDGETS = [
+    ("POST", "/words/all", {"limit": 20, "cursor": ""}, 4),
+    ("POST", "/words/all", {"limit": 20, "offset": 0, "total": "exact"}, 3),
+    ("GET", "/words/search/語", None, 2),
+    ("POST", "/examples/all", {"limit": 20, "cursor": ""}, 4),
+    ("GET", "/words/personal/random/20", None, 3),
+    ("GET", "/user_word_skill/due/20", None, 2),
+    ("GET", "/user_text/all", None, 3),
+    ("GET", "/user_data/summary/user", None, 2),
+    ("GET", "/user_data/all/user", None, 8),
+    ("POST", "/text/analyze", {"text": "犬が走る", "format": "compact"}, 3),
+]
+
+
+@pytest.mark.parametrize("method,url,body,budget", BUDGETS, ids=[f"{m} {u}" for m, u, _, _ in BUDGETS])
+def test_query_budget(client, method, url, body, budget):
+    counter = _queries(client, method, url, json=body)
+    statements = "\n".join(" ".join(s.split())[:120] for s in counter.statements)
+    assert counter.count <= budget, f"{method} {url}: {counter.count} queries (budget {budget})\n{statements}"
+
+
+def test_query_count_does_not_grow_with_rows(client):
+    before = [_queries(client, m, u, json=b).count for m, u, b, _ in BUDGETS]
+    _seed_words(client, WORDS_PER_USER)
+    after = [_queries(client, m, u, json=b).count for m, u, b, _ in BUDGETS]
+    for (method, url, _, _), n_before, n_after in zip(BUDGETS, before, after):
+        assert n_after <= n_before, f"{method} {url}: {n_before} -> {n_after} queries"
@@ -0,0 +1,62 @@
+# test_session_cache.py
+# 검증된 세션 캐시 TTL / LRU (DB 불필요, 시계는 바꿔 끼움)
+from types import SimpleNamespace
+
+import pytest
+
+from utils import session_cache as session_cache_module
+from utils.session_cache import SessionCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_cache_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_hit_until_ttl_expires(clock):
+    cache = SessionCache(max_size=10, ttl_seconds=30)
+    cache.put(b"a", "s1", "principal")
+    clock[0] += 30
+    assert cache.get(b"a") == ("s1", "principal")
+    clock[0] += 1
+    assert cache.get(b"a") is None
+    assert cache.stats()["size"] == 0  # 만료된 항목은 조회 시 지운다
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_evicts_least_recently_used(clock):
+    cache = SessionCache(max_size=2, ttl_seconds=30)
+    cache.put(b"a", "s1", "p1")
+    cache.put(b"b", "s2", "p2")
+    assert cache.get(b"a") is not None  # a 를 최근 사용으로
+    cache.put(b"c", "s3", "p3")
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") == ("s1", "p1")
+    assert cache.get(b"c") == ("s3", "p3")
+
+
+def test_put_refreshes_stored_time(clock):
+    cache = SessionCache(max_size=10, ttl_seconds=30)
+    cache.put(b"a", "s1", "p1")
+    clock[0] += 20
+    cache.put(b"a", "s1", "p1")
+    clock[0] += 20
+    assert cache.get(b"a") == ("s1", "p1")
+
+
+def test_revoke(clock):
+    cache = SessionCache(max_size=10, ttl_seconds=30)
+    cache.put(b"a", "s1", "p1")
+    cache.revoke(b"a")
+    assert cache.get(b"a") is None
+    assert cache.stats()["revoked"] == 1
+
+
+@pytest.mark.parametrize("max_size,ttl_seconds", [(0, 30), (10, 0)])
+def test_disabled(clock, max_size, ttl_seconds):
+    cache = SessionCache(max_size=max_size, ttl_seconds=ttl_seconds)
+    cache.put(b"a", "s1", "p1")
+    assert cache.get(b"a") is None
+    assert cache.stats()["size"] == 0
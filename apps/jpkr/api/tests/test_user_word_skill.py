@@ -0,0 +1,49 @@
+# test_user_word_skill.py
+# 숙련도 upsert 입력 합치기 (DB 불필요)
+from models import UserWordSkillUpsertData
+from service.user_word_skill import SKILL_FIELDS, merge_skill_upserts
+
+
+def _item(word_id, **kwargs):
+    return UserWordSkillUpsertData(word_id=word_id, **kwargs)
+
+
+def test_one_row_per_word_in_input_order():
+    rows = merge_skill_upserts([_item("w2", skill_kanji=1), _item("w1", skill_kanji=2), _item("w2", skill_kanji=3)])
+    assert [row["word_id"] for row in rows] == ["w2", "w1"]
+    assert rows[0]["skill_kanji_set"] == 3
+
+
+def test_untouched_fields_stay_empty():
+    row, = merge_skill_upserts([_item("w", skill_kanji=5)])
+    assert (row["skill_kanji_set"], row["skill_kanji_inc"]) == (5, 0)
+    for field in SKILL_FIELDS[1:]:
+        assert (row[f"{field}_set"], row[f"{field}_inc"]) == (None, 0)
+    assert row["is_favorite"] is None
+    assert row["quality"] is None
+
+
+def test_increments_accumulate_after_last_set():
+    row, = merge_skill_upserts([
+        _item("w", skill_kanji=10, increment=True),
+        _item("w", skill_kanji=-3, increment=True),
+        _item("w", skill_word_reading=40),
+        _item("w", skill_word_reading=5, increment=True),
+    ])
+    assert (row["skill_kanji_set"], row["skill_kanji_inc"]) == (None, 7)
+    assert (row["skill_word_reading_set"], row["skill_word_reading_inc"]) == (40, 5)
+
+
+def test_set_discards_earlier_increments():
+    row, = merge_skill_upserts([_item("w", skill_kanji=10, increment=True), _item("w", skill_kanji=50)])
+    assert (row["skill_kanji_set"], row["skill_kanji_inc"]) == (50, 0)
+
+
+def test_favorite_and_quality_take_last_value_sent():
+    row, = merge_skill_upserts([
+        _item("w", is_favorite=True, quality=2),
+        _item("w", quality=5),
+        _item("w", skill_kanji=1),
+    ])
+    assert row["is_favorite"] is True
+    assert row["quality"] == 5
@@ -0,0 +1,131 @@
+from typing import Dict, List, Optional, Type
+from sqlalchemy import select, or_, func, table, column
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm.decl_api import DeclarativeMeta
+from db import Base
+
+# ---------------------------------------------------------------------
+# 부분 문자열 검색 인덱스
+#   모델에 __searchable__ = ("col", ...) 로 선언한 컬럼에 대해
+#   - PostgreSQL : pg_trgm GIN 인덱스 (ILIKE '%w%' 가 그대로 인덱스를 탄다)
+#   - SQLite     : FTS5(trigram) 외부 콘텐츠 테이블 <table>_fts + 동기화 트리거
+#   서버 시작 시 ensure_search_indexes(engine) 으로 만들고, 만들어진 것만 search_backends 에 기록한다.
+#   (확장이 없거나 SQLite 가 FTS5 trigram 을 지원하지 않으면 기존 LIKE 검색 그대로)
+# ---------------------------------------------------------------------
+
+# table_name -> "trgm" | "fts5"
+search_backends: Dict[str, str] = {}
+
+# FTS5 trigram 으로 찾을 수 있는 최소 단어 길이
+FTS_MIN_TERM_LENGTH = 3
+
+
+def searchable_models() -> List[Type[DeclarativeMeta]]:
+    return [m.class_ for m in Base.registry.mappers if getattr(m.class_, "__searchable__", None)]
+
+
+def fts_table_name(table_name: str) -> str:
+    return f"{table_name}_fts"
+
+
+def _ensure_trgm(conn, Model) -> None:
+    t = Model.__tablename__
+    for col in Model.__searchable__:
+        conn.exec_driver_sql(
+            f'CREATE INDEX IF NOT EXISTS ix_{t}_{col}_trgm ON "{t}" USING gin ("{col}" gin_trgm_ops)'
+        )
+
+
+def _ensure_fts5(conn, Model) -> None:
+    t = Model.__tablename__
+    fts = fts_table_name(t)
+    cols = list(Model.__searchable__)
+    col_list = ", ".join(cols)
+    new_cols = ", ".join(f"new.{c}" for c in cols)
+    old_cols = ", ".join(f"old.{c}" for c in cols)
+
+    existing = conn.exec_driver_sql(f"PRAGMA table_info({fts})").fetchall()
+    if existing and [row[1] for row in existing] != cols:
+        # 선언한 컬럼이 바뀌었으면 다시 만든다
+        for suffix in ("ai", "ad", "au"):
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+        conn.exec_driver_sql(f"DROP TABLE {fts}")
+        existing = []
+
+    conn.exec_driver_sql(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{col_list}, content='{t}', content_rowid='id', tokenize='trigram')"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {t} BEGIN "
+        f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_cols}); END"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {t} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_cols}); END"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {t} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_cols}); "
+        f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_cols}); END"
+    )
+    if not existing:
+        # 이미 있던 행들 색인
+        conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def ensure_search_indexes(engine: Engine) -> None:
+    """__searchable__ 선언에 맞춰 검색 인덱스를 만든다 (여러 번 실행해도 안전). 실패하면 경고만 하고 LIKE 검색으로 둔다."""
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        backend, ensure = "trgm", _ensure_trgm
+        try:
+            with engine.begin() as conn:
+                conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except Exception as e:
+            print("search index: pg_trgm is not available, fall back to ILIKE scan:", e)
+            return
+    elif dialect == "sqlite":
+        backend, ensure = "fts5", _ensure_fts5
+    else:
+        return
+
+    for Model in searchable_models():
+        try:
+            with engine.begin() as conn:
+                ensure(conn, Model)
+            search_backends[Model.__tablename__] = backend
+        except Exception as e:
+            print(f"search index: {Model.__tablename__} ({backend}) failed, fall back to LIKE scan:", e)
+    print("search indexes:", search_backends)
+
+
+def search_condition(Model: Type[DeclarativeMeta], col_name: str, words: List[str], dialect: str) -> Optional[object]:
+    """
+    한 컬럼에 대한 단어들 OR 조건
+    - PostgreSQL : ILIKE (pg_trgm 인덱스가 있으면 인덱스 사용)
+    - SQLite + FTS5 : id IN (SELECT rowid FROM <table>_fts WHERE col LIKE '%w%')  (trigram 인덱스 사용, 대소문자 무시)
+                      3글자 미만 단어는 LOWER(col) LIKE
+    - 그 외 : LOWER(col) LIKE
+    """
+    words = [str(w) for w in words if w is not None and str(w) != ""]
+    if not words:
+        return None
+    col = getattr(Model, col_name)
+    if dialect == "postgresql":
+        return or_(*[col.ilike(f"%{w}%") for w in words])
+
+    conds = []
+    t = Model.__tablename__
+    if search_backends.get(t) == "fts5" and col_name in Model.__searchable__:
+        # trigram 은 3글자 이상만 색인으로 찾을 수 있다 (그보다 짧은 비 ASCII 단어는 아예 안 잡힘) → 짧은 단어는 LIKE 로
+        long_words = [w for w in words if len(w) >= FTS_MIN_TERM_LENGTH]
+        words = [w for w in words if len(w) < FTS_MIN_TERM_LENGTH]
+        if long_words:
+            fts = table(fts_table_name(t), column("rowid"), column(col_name))
+            matched = select(fts.c.rowid).where(or_(*[fts.c[col_name].like(f"%{w}%") for w in long_words]))
+            conds.append(Model.id.in_(matched))
+
+    # 범용: LOWER(col) LIKE LOWER(:word)
+    conds.extend(func.lower(col).like(f"%{w.lower()}%") for w in words)
+    return or_(*conds)
@@ -72,6 +72,7 @@ class TimestampMixin:
 
 class ImageFile(TimestampMixin, Base):
     __tablename__ = "image_files"
+    __searchable__ = ("tags",)  # 부분 문자열 검색 인덱스 (db/search.py)
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
     tags: Mapped[str] = mapped_column(Text, nullable=False)
@@ -85,6 +86,7 @@ class ImageFile(TimestampMixin, Base):
 # ---------------------------------------------------------------------
 class User(TimestampMixin, Base):
     __tablename__ = "users"
+    __searchable__ = ("email", "display_name")
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     email: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     __table_args__ = (Index("uq_users_email_lower", func.lower(email), unique=True),)
@@ -2,6 +2,7 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from db import Base, engine
+from db.search import ensure_search_indexes
 from dotenv import load_dotenv
 from fastapi.staticfiles import StaticFiles
 import os
@@ -52,6 +53,7 @@ def server():
         #    except Exception:
         #        pass
         Base.metadata.create_all(bind=engine)
+        ensure_search_indexes(engine)
         if settings.google_client_id and settings.google_client_secret and settings.google_redirect_uri:            
             app.include_router(auth_router)
             print("Google OAuth is configured.")
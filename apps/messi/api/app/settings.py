@@ -24,6 +24,13 @@ class Settings(BaseModel):
     S3_BUCKET_DIRECTORY: str = os.getenv("S3_BUCKET_DIRECTORY", "messi")
     S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")
     MAX_IMAGE_SIZE_MB: int = 1
+    # 공유 S3 client 설정 (MinIO 등 로컬 호환 서버는 addressing style 을 path 로)
+    S3_ADDRESSING_STYLE: str = os.getenv("S3_ADDRESSING_STYLE", "virtual")
+    S3_MAX_POOL_CONNECTIONS: int = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "20"))
+    S3_TCP_KEEPALIVE: bool = os.getenv("S3_TCP_KEEPALIVE", "true").lower() == "true"
+    # presigned URL 캐시 (0 이면 사용 안 함), 남은 유효시간이 이 비율 미만이면 재발급
+    PRESIGN_CACHE_SIZE: int = int(os.getenv("PRESIGN_CACHE_SIZE", "10000"))
+    PRESIGN_REFRESH_FRACTION: float = float(os.getenv("PRESIGN_REFRESH_FRACTION", "0.5"))
 
     STATIC_DIR: str = os.getenv("STATIC_DIR", "")
     STATIC_ROUTE: str = os.getenv("STATIC_ROUTE", "/static")
@@ -6,7 +6,7 @@ from sqlalchemy import select, update, func
 
 from settings import settings
 from db import SessionLocal, get_db
-from db.tables import User, Session as DbSession
+from db.tables import User, Role, UserRole, Session as DbSession
 from db.models import UserData
 
 def random_urlsafe(nbytes: int = 32) -> str:
@@ -52,39 +52,64 @@ def pop_return_to_cookie(resp: Response):
 
 
 
-def _load_user_from_session_cookie(request: Request, db: Session) -> User:
+def principal_stmt(sid_hash: bytes):
     """
-    routes_auth.py 의 /auth/me 와 동일한 규칙으로
-    세션 쿠키를 검증하고 사용자 객체를 반환합니다.
+    세션 해시 → 인증 주체(사용자 기본 컬럼 + 역할 이름) 한 번의 조인으로 조회.
+    역할이 여러 개면 역할마다 한 행, 역할이 없으면 role_name 이 None 인 한 행.
+    (User 의 이미지/세션 등 관계는 건드리지 않으므로 데이터 양과 무관하게 일정한 비용)
     """
-    cookie_name = settings.session_cookie_name  # routes_auth.py에서 쓰는 것과 동일해야 함
-    raw = request.cookies.get(cookie_name)
-    if not raw:
-        raise HTTPException(status_code=401, detail="no session")
-
-    sid_hash = hash_token(raw)
-    sess = db.scalar(
-        select(DbSession).where(
+    return (
+        select(DbSession.id.label("session_id"), User.id, User.email, User.display_name, User.picture_url,
+               Role.name.label("role_name"))
+        .join(User, User.id == DbSession.user_id)
+        .outerjoin(UserRole, UserRole.user_id == User.id)
+        .outerjoin(Role, Role.id == UserRole.role_id)
+        .where(
             DbSession.session_id_hash == sid_hash,
             DbSession.revoked_at.is_(None),
+            User.is_active.is_(True),
         )
     )
-    if not sess:
-        raise HTTPException(status_code=401, detail="invalid session")
 
-    user = db.get(User, sess.user_id)
-    if not user or not getattr(user, "is_active", True):
-        raise HTTPException(status_code=401, detail="inactive or missing user")
-
-    # 최근 접속 갱신(선택)
-    db.execute(
-        update(DbSession)
-        .where(DbSession.id == sess.id)
-        .values(last_seen_at=func.now())
+def rows_to_principal(rows) -> UserData | None:
+    if not rows:
+        return None
+    first = rows[0]
+    return UserData(
+        id=first.id,
+        email=first.email,
+        display_name=first.display_name,
+        picture_url=first.picture_url,
+        roles=[row.role_name for row in rows if row.role_name],
     )
-    db.commit()
 
-    return user
+def load_principal(db: Session, sid_hash: bytes, touch: bool = True) -> UserData | None:
+    rows = db.execute(principal_stmt(sid_hash)).all()
+    principal = rows_to_principal(rows)
+    if principal is not None and touch:
+        # 최근 접속 갱신(선택)
+        db.execute(
+            update(DbSession)
+            .where(DbSession.id == rows[0].session_id)
+            .values(last_seen_at=func.now())
+        )
+        db.commit()
+    return principal
+
+def _load_user_from_session_cookie(request: Request, db: Session) -> UserData:
+    """
+    routes_auth.py 의 /auth/me 와 동일한 규칙으로
+    세션 쿠키를 검증하고 인증 주체를 반환합니다.
+    """
+    cookie_name = settings.session_cookie_name  # routes_auth.py에서 쓰는 것과 동일해야 함
+    raw = request.cookies.get(cookie_name)
+    if not raw:
+        raise HTTPException(status_code=401, detail="no session")
+
+    principal = load_principal(db, hash_token(raw))
+    if principal is None:
+        raise HTTPException(status_code=401, detail="invalid session")
+    return principal
 
 def get_current_user(
     request: Request,
@@ -96,20 +121,6 @@ def get_current_user(
     인증이 선택인 엔드포인트에서 사용. 세션 없으면 None 반환.
     """
     try:
-        user = _load_user_from_session_cookie(request, db)
+        return _load_user_from_session_cookie(request, db)
     except HTTPException:
         return None
-
-    roles = []
-    if hasattr(user, "user_roles") and user.user_roles:
-        roles = [ur.role.name for ur in user.user_roles if hasattr(ur, "role") and ur.role]
-
-    return UserData(
-        id=str(user.id),
-        email=user.email,
-        display_name=getattr(user, "display_name", None),
-        picture_url=getattr(user, "picture_url", None),
-        roles=roles,
-    )
-
-
@@ -2,23 +2,106 @@
 import uuid
 import mimetypes
 import io
+import time
+import threading
+from collections import OrderedDict
 import boto3
 from botocore.client import Config
-from typing import BinaryIO
+from typing import BinaryIO, Optional
 from settings import settings
 
 ALLOWED_CT = {"image/jpeg", "image/png", "image/webp", "image/gif"}
 
-def get_s3():
-    return boto3.client(
+
+# presigned URL 캐시
+# 같은 이미지의 URL 을 요청마다 새로 서명하지 않고, 남은 유효시간이
+# PRESIGN_REFRESH_FRACTION 보다 적어졌을 때만 다시 발급한다. (object key, 유효시간 별로 - 요청보다 오래 유효한 URL 은 내주지 않음)
+class PresignCache:
+    def __init__(self, max_size: int, refresh_fraction: float):
+        self.max_size = max(0, int(max_size))
+        self.refresh_fraction = min(max(float(refresh_fraction), 0.0), 1.0)
+        self._data: "OrderedDict[str, dict]" = OrderedDict()  # key -> {expires: (url, issued_at)}
+        self._lock = threading.Lock()
+        # metrics
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str, expires: int) -> Optional[str]:
+        if self.max_size == 0:
+            return None
+        now = time.time()  # URL 만료는 벽시계 기준
+        with self._lock:
+            item = self._data.get(key, {}).get(expires)
+            if item is not None:
+                url, issued_at = item
+                remaining = issued_at + expires - now
+                if remaining > expires * self.refresh_fraction:
+                    self._data.move_to_end(key)
+                    self._hits += 1
+                    return url
+            self._misses += 1
+            return None
+
+    def put(self, key: str, url: str, issued_at: float, expires: int):
+        if self.max_size == 0:
+            return
+        with self._lock:
+            self._data.setdefault(key, {})[expires] = (url, issued_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "refresh_fraction": self.refresh_fraction,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+presign_cache = PresignCache(settings.PRESIGN_CACHE_SIZE, settings.PRESIGN_REFRESH_FRACTION)
+
+# boto3 client 는 만들 때 자격증명/엔드포인트 해석과 HTTP 커넥션 풀 생성 비용이 크다.
+# 프로세스에 하나만 만들어 두고 공유한다. (client 자체는 스레드 간 공유 가능,
+# 생성에 쓰는 boto3 Session 은 스레드 안전하지 않으므로 생성만 락으로 보호)
+_s3_client = None
+_s3_lock = threading.Lock()
+
+def new_s3_client():
+    session = boto3.session.Session()
+    return session.client(
         "s3",
         region_name=settings.AWS_REGION,
         aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
         aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        endpoint_url=settings.S3_ENDPOINT_URL,
-        config=Config(s3={"addressing_style": "virtual"})
+        endpoint_url=settings.S3_ENDPOINT_URL or None,
+        config=Config(
+            s3={"addressing_style": settings.S3_ADDRESSING_STYLE},
+            max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+            tcp_keepalive=settings.S3_TCP_KEEPALIVE,
+        )
     )
 
+def get_s3():
+    global _s3_client
+    if _s3_client is None:
+        with _s3_lock:
+            if _s3_client is None:
+                _s3_client = new_s3_client()
+    return _s3_client
+
 def is_allowed_content_type(ct: str | None) -> bool:
     return (ct or "") in ALLOWED_CT
 
@@ -53,13 +136,20 @@ def upload_fileobj(fp: BinaryIO, key: str, content_type: str):
     )
 
 def presign_get_url(key: str, expires: int = 3600) -> str:
+    url = presign_cache.get(key, expires)
+    if url is not None:
+        return url
+    issued_at = time.time()
     s3 = get_s3()
-    return s3.generate_presigned_url(
+    url = s3.generate_presigned_url(
         "get_object",
         Params={"Bucket": settings.S3_BUCKET, "Key": key},
         ExpiresIn=expires,
     )
+    presign_cache.put(key, url, issued_at, expires)
+    return url
 
 def delete_object(key: str):
+    presign_cache.invalidate(key)
     s3 = get_s3()
     s3.delete_object(Bucket=settings.S3_BUCKET, Key=key)
@@ -1,9 +1,11 @@
 from typing import Dict, List, Optional, Tuple, Type, Any, Sequence
-from sqlalchemy import select, or_, and_, func, String, Text, inspect, delete
+from sqlalchemy import select, insert, update, or_, and_, func, String, Text, inspect, delete
 from sqlalchemy.orm import Session
 from sqlalchemy.orm.decl_api import DeclarativeMeta
 from db.models import FilterData, UserData
-from sqlalchemy.dialects.postgresql import insert  # SQLite 3.35+도 insert 사용 가능 (SQLAlchemy가 변환)
+from db.search import search_condition
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert  # ON CONFLICT / RETURNING 은 SQLite 3.35+
 
 
 
@@ -36,17 +38,10 @@ def generic_read(
             if col_name not in table_cols or col_name not in string_cols:
                 # 존재하지 않거나 문자열 컬럼이 아니면 스킵 (화이트리스트)
                 continue
-            col = table_cols[col_name]
-
-            # 같은 컬럼에 대해 단어들 OR
-            if dialect == "postgresql":
-                ors = [col.ilike(f"%{w}%") for w in words if w is not None and str(w) != ""]
-            else:
-                # 범용: LOWER(col) LIKE LOWER(:word)
-                ors = [func.lower(col).like(f"%{str(w).lower()}%")
-                       for w in words if w is not None and str(w) != ""]
-            if ors:
-                column_groups.append(or_(*ors))
+            # 같은 컬럼에 대해 단어들 OR (검색 인덱스가 있으면 그쪽으로, db/search.py)
+            cond = search_condition(Model, col_name, words, dialect)
+            if cond is not None:
+                column_groups.append(cond)
 
     where_clause = None
     if column_groups:
@@ -72,13 +67,31 @@ def generic_read(
     if where_clause is not None:
         base = base.where(where_clause)
 
-    count_stmt = select(func.count()).select_from(base.subquery())
-    total = db.execute(count_stmt).scalar_one()
-
-    stmt = base.order_by(order_expr).offset(start).limit(limit)
-    rows = db.execute(stmt).scalars().all()
+    # 전체 개수는 같은 쿼리에서 window 함수로 (목록 + count 두 번 훑지 않음)
+    stmt = (
+        base.add_columns(func.count().over().label("total"))
+        .order_by(order_expr).offset(start).limit(limit)
+    )
+    result = db.execute(stmt).all()
+    rows = [r[0] for r in result]
+    if result:
+        total = result[0].total
+    elif start > 0:
+        # offset 이 끝을 넘으면 개수를 따로 센다
+        total = db.execute(select(func.count()).select_from(base.subquery())).scalar_one()
+    else:
+        total = 0
     return rows, total
 
+def _upsert_insert(Model: Type[DeclarativeMeta], dialect: str):
+    """INSERT ... ON CONFLICT DO NOTHING 을 지원하는 dialect 면 그 insert 를, 아니면 일반 insert"""
+    if dialect == "postgresql":
+        return pg_insert(Model).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        return sqlite_insert(Model).on_conflict_do_nothing()
+    return insert(Model)
+
+
 def generic_upsert(
     Model: Type[DeclarativeMeta],
     data_list: List[Dict[str, Any]],
@@ -93,107 +106,114 @@ def generic_upsert(
     INSERT : DUPLICATE 가 아니면서 user 소유의 데이터 중 id 값이 일치하는 것이 없는 경우 
              (id 값이 일치해도 타인 소유면 UPDATE 하지 않고 INSERT)
              (id 값이 없는 경우에도 INSERT)    
+    조회는 입력에 들어온 id / unique 값으로만 (테이블 전체를 읽지 않음),
+    UPDATE 는 pk 기준 bulk UPDATE, INSERT 는 ON CONFLICT DO NOTHING 으로 한 번에 하고 커밋도 한 번.
+    (조회와 INSERT 사이에 다른 요청이 같은 unique 값을 넣었으면 DUPLICATE 로 돌려준다)
     """
     result = {"inserted": {}, "updated": {}, "duplicates": []}
     if not data_list:
         return result
 
+    dialect = db.bind.dialect.name if db.bind is not None else ""
+
     # Model 컬럼 목록
     col_names = {c.name for c in Model.__table__.columns}
 
-    # ---------- 중복 판정 준비 ----------
-    # 입력에서 unique 값 모으기
-    values = []
-    for data in data_list:
-        if unique_column in data and data[unique_column] is not None:
-            values.append(data[unique_column])
+    def unique_value(data):
+        if unique_column and data.get(unique_column) is not None:
+            return data[unique_column]
+        return None
 
     # 중복 범위: user가 주어지고, Model에 user_id가 있으면 user별로, 아니면 전역
-    scope_is_user = ("user_id" in col_names) and (user is not None) and getattr(user.__dict__, "id", None)
+    scope_is_user = ("user_id" in col_names) and (user is not None) and getattr(user, "id", None) is not None
+
+    def scoped(stmt):
+        if scope_is_user:
+            stmt = stmt.where(getattr(Model, "user_id") == user.id)
+        return stmt
 
-    # 기존 DB에 있는 값들 한 번에 조회
-    uq_col = getattr(Model, unique_column)
-    stmt = select(Model).where(uq_col.in_(values))
-    if scope_is_user:
-        stmt = stmt.where(getattr(Model, "user_id") == user.id)
+    # ---------- 중복 판정 준비 (입력 값으로만 조회) ----------
+    values = {unique_value(data) for data in data_list} - {None}
+    existing_map = {}  # unique 값 → 기존 id
+    if values:
+        uq_col = getattr(Model, unique_column)
+        existing_map = dict(db.execute(scoped(select(uq_col, Model.id).where(uq_col.in_(values)))).all())
+
+    ids = {data["id"] for data in data_list if data.get("id") is not None}
+    existing_ids = set()
+    if ids:
+        existing_ids = set(db.execute(scoped(select(Model.id).where(Model.id.in_(ids)))).scalars().all())
 
-    existing_rows = db.execute(stmt).scalars().all()
-    existing_map = {getattr(r, unique_column): r for r in existing_rows}
     # 입력 내부 중복도 잡기 위한 seen 집합
     seen_in_batch = set()
 
-    # 기존 데이터 ID 목록
-    total_ids = set(db.execute(select(Model.id)).scalars().all())
-    if scope_is_user:
-        total_ids = set(db.execute(select(Model.id).where(getattr(Model, "user_id") == user.id)).scalars().all())
-
     # UPDATE 할 것, INSERT할 것, 중복으로 스킵할 것 분리
     to_update = []
     to_insert = []
     for data in data_list:
-        if unique_column in data and data[unique_column] is not None:
-            v = data[unique_column]
-        else:
-            v = None
+        v = unique_value(data)
         # unique 값이 비어있으면 중복 판단 불가 → 그냥 생성쪽으로 보냄(원한다면 여기서 스킵 규칙을 바꿀 수 있음)
         if v is None:
-            if "id" in data:
-                if data["id"] in total_ids:
-                    to_update.append(data)
-                    continue
+            if data.get("id") in existing_ids:
+                to_update.append(data)
+                continue
             to_insert.append(data)
             continue
 
         # 전역/유저 범위 내 기존 존재 or 배치 내부에서 이미 본 값 → 중복
         if (v in existing_map) or (v in seen_in_batch):
-            if "id" in data:
-                if data["id"] == existing_map[v].id:
-                    to_update.append(data)
-                    continue
-            result["duplicates"].append(data)
-            continue
-        # 유효: 생성
-        if "id" in data:
-            if data["id"] in total_ids:
+            if v not in seen_in_batch and data.get("id") is not None and data["id"] == existing_map[v]:
                 to_update.append(data)
                 seen_in_batch.add(v)
                 continue
+            result["duplicates"].append(data)
+            continue
+        # 유효: 생성
+        if data.get("id") in existing_ids:
+            to_update.append(data)
+            seen_in_batch.add(v)
+            continue
 
         to_insert.append(data)
         seen_in_batch.add(v)
-        continue
-
-
-    # ---------- UPDATE ----------
-    for data in to_update:
-        row = db.query(Model).filter(Model.id == data["id"]).first()
-        if row:
-            for key, value in data.items():
-                if key != "id":
-                    if key in Model.__table__.columns:
-                        setattr(row, key, value)
-        result["updated"][data["id"]] = row
-    db.commit()
 
-    # ---------- INSERT ----------
-    if scope_is_user:
-        for data in to_insert:
-            data.setdefault("user_id", user.id)
+    # ---------- UPDATE (pk 기준 bulk UPDATE) ----------
+    updates = [{k: v for k, v in data.items() if k in col_names} for data in to_update]
+    if updates:
+        db.execute(update(Model), updates)
 
-    objs = []
+    # ---------- INSERT ----------
+    rows = []
     for data in to_insert:
-        if "id" in data:
-            del data["id"]
-        objs.append(Model(**data))
-    if objs:
-        db.add_all(objs)
-        db.commit()
+        row = {k: v for k, v in data.items() if k in col_names and k != "id"}
+        if scope_is_user:
+            row.setdefault("user_id", user.id)
+        rows.append(row)
+    inserted = []
+    if rows:
+        inserted = db.execute(_upsert_insert(Model, dialect).returning(Model), rows).scalars().all()
+        # ON CONFLICT 로 건너뛴 행 (동시에 들어온 같은 unique 값) → DUPLICATE
+        if unique_column:
+            inserted_values = {getattr(o, unique_column) for o in inserted}
+            for data in to_insert:
+                v = unique_value(data)
+                if v is not None and v not in inserted_values:
+                    result["duplicates"].append(data)
+
+    updated = []
+    if updates:
+        updated = db.execute(
+            select(Model).where(Model.id.in_([data["id"] for data in updates]))
+            .execution_options(populate_existing=True)
+        ).scalars().all()
+    db.commit()
 
     # 직렬화
     pk_name = next(iter(Model.__mapper__.primary_key)).name
-    for o in objs:
-        pk = getattr(o, pk_name)
-        result["inserted"][pk] = o
+    for o in updated:
+        result["updated"][getattr(o, pk_name)] = o
+    for o in inserted:
+        result["inserted"][getattr(o, pk_name)] = o
     return result
 
 